@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from ..database import get_session, dbm
+from ..database import dbm, dimension_cache
+from ..db_runtime import get_async_read_session, get_write_session
 from .. import schemas, auth
-from ..scraper import scrape_and_update_all_schedules_async
-import httpx
-import atexit
-import urllib
+from ..scraper import scrape_and_update_all_schedules_async, page_digest_stats, lesson_sync_stats, pipeline_stats
+from ..parsers.schedule_downloader import cache, disk_cache, stream_stats, adaptive_limiter, client_session
+from ..university_crawl import run_university_crawl, crawl_progress
+from ..refresh_scheduler import scheduler_state
+from ..crawl_jobs import CrawlJob, submit_job, get_job, cancel_job
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,19 +27,24 @@ async def read_schedules(
     limit: int = Query(100, description="Limit the number of items"),
     sort_by: Optional[str] = Query(None, description="Sort by field (e.g., start_time, subject_name)"),
     sort_order: str = Query("asc", description="Sort order (asc or desc)"),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_read_session),
     current_user: schemas.User = Depends(auth.get_current_active_user)
 ):
     """
     Получает список расписаний, с возможностью сортировки.
     """
-    query = db.query(dbm.Lesson)
+    # Связи для schemas.Lesson загружаются в том же запросе: ленивая загрузка в AsyncSession невозможна
+    query = select(dbm.Lesson).options(
+        joinedload(dbm.Lesson.subject), joinedload(dbm.Lesson.teacher),
+        joinedload(dbm.Lesson.classroom), joinedload(dbm.Lesson.group),
+    )
 
     # Добавляем сортировку, если указано
     if sort_by:
         if sort_by == "subject_name":
-            sort_column = dbm.Lesson.subject.hasattr('name') # Сортировка по имени предмета
-        elif hasattr(dbm.Lesson, sort_by):
+            query = query.join(dbm.Lesson.subject)
+            sort_column = dbm.Subject.name  # Сортировка по имени предмета
+        elif sort_by in dbm.Lesson.__table__.c:  # Только колонки: сортировка по связи (subject, group...) не имеет смысла
             sort_column = getattr(dbm.Lesson, sort_by)
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_by parameter")
@@ -45,11 +54,11 @@ async def read_schedules(
         else:
             query = query.order_by(sort_column) # Сортировка по возрастанию
 
-    schedules = query.offset(skip).limit(limit).all()
+    schedules = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
     return schedules
 
 @router.post("/", response_model=schemas.Lesson, status_code=status.HTTP_201_CREATED)
-async def create_schedule(schedule: schemas.LessonCreate, db: Session = Depends(get_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+async def create_schedule(schedule: schemas.LessonCreate, db: Session = Depends(get_write_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
     """
     Создает новое расписание (только для администраторов).
     """
@@ -82,7 +91,7 @@ async def create_schedule(schedule: schemas.LessonCreate, db: Session = Depends(
     return db_schedule
 
 @router.put("/{schedule_id}", response_model=schemas.Lesson)
-async def update_schedule(schedule_id: int, schedule: schemas.LessonUpdate, db: Session = Depends(get_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+async def update_schedule(schedule_id: int, schedule: schemas.LessonUpdate, db: Session = Depends(get_write_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
     """
     Обновляет расписание по ID (только для администраторов).
     """
@@ -131,7 +140,7 @@ async def update_schedule(schedule_id: int, schedule: schemas.LessonUpdate, db:
     return db_schedule
 
 @router.delete("/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_schedule(schedule_id: int, db: Session = Depends(get_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+async def delete_schedule(schedule_id: int, db: Session = Depends(get_write_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
     """
     Удаляет расписание по ID (только для администраторов).
     """
@@ -148,30 +157,86 @@ async def delete_schedule(schedule_id: int, db: Session = Depends(get_session),
 
 @router.post("/force_parse", status_code=status.HTTP_200_OK)
 async def force_parse(
-    background_tasks: BackgroundTasks,
     group_numbers: List[str] = Query(["М8О-102БВ-24"], description="Список номеров групп"),
     week_numbers: List[int] = Query([10], description="Список номеров недель (1-18)"),
-    db: Session = Depends(get_session),
-    # current_user: schemas.User = Depends(auth.get_current_active_admin_user),
+    current_user: schemas.User = Depends(auth.get_current_active_admin_user),
 ):
     """
     Запускает принудительный парсинг для указанных групп и недель (только для администраторов).
+
+    Если такая же задача (те же группы и недели) уже выполняется, возвращается она, второй
+    обход не запускается. Прогресс - в GET /schedule/jobs/{job_id}.
     """
 
-    async def run_scraper(group_numbers: list[str], week_numbers: list[int], db: Session):
-        logger.info(f"Запуск скрапера в фоне для групп: {group_numbers}, недели: {week_numbers}")
-        async with httpx.AsyncClient(timeout=15.0) as client: # Create httpx Client
-            await client.get(f'https://mai.ru/education/studies/schedule/index.php?group={urllib.parse.quote("М8О-102БВ-24")}&week={10}')
-            await scrape_and_update_all_schedules_async(db, client, group_numbers, week_numbers)  # Pass the client
+    async def run_scraper(job: CrawlJob):
+        logger.info(f"Запуск скрапера в фоне для групп: {job.group_numbers}, недели: {job.week_numbers}")
+        async with client_session() as client:  # Общий клиент приложения: соединения с сайтом уже открыты
+            await scrape_and_update_all_schedules_async(client, job.group_numbers, job.week_numbers,
+                                                        on_page_done=job.on_page_done)
+        logger.info("Скрапинг завершен.")
 
-            def close_client() -> None:
-                logger.info("Закрываем сессию httpx...")
-                client.close()
-                logger.info("Сессия httpx закрыта.")
+    job, created = submit_job(group_numbers, week_numbers, run_scraper)
+    message = "запущен в фоновом режиме" if created else "уже выполняется"
+    return {
+        "message": f"Парсинг расписания для групп {group_numbers}, недели {week_numbers} {message}.",
+        "job_id": job.id,
+        "created": created,
+    }
+
+@router.get("/jobs/{job_id}")
+async def read_job(job_id: str, current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+    """Состояние задачи парсинга: счетчики страниц, время выполнения и скорость."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.to_dict()
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_parse_job(
+    job_id: str,
+    current_user: schemas.User = Depends(auth.get_current_active_admin_user),
+):
+    """Отменяет задачу парсинга (только для администраторов); уже сохраненные страницы остаются в БД."""
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.to_dict()
+
+@router.get("/stats")
+async def read_scraper_stats(current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+    """
+    Возвращает статистику скрапера (только для администраторов): пропуски неизменившихся страниц по дайджесту, изменения уроков,
+    стадии конвейера обхода, кэш справочников, кэш загрузок и single-flight, работу дискового
+    HTTP-кэша и текущее окно адаптивного лимита загрузок.
+    """
+    return {
+        "page_digest": page_digest_stats,
+        "lesson_sync": lesson_sync_stats,
+        "pipeline": pipeline_stats,
+        "dimension_cache": {**dimension_cache.stats, "sizes": dimension_cache.sizes()},
+        "download_cache": cache.stats,
+        "stream_download": stream_stats,
+        "disk_cache": disk_cache.stats if disk_cache else None,
+        "adaptive_limiter": adaptive_limiter.stats,
+        "university_crawl": crawl_progress,
+        "scheduler": scheduler_state,
+    }
+
+@router.post("/crawl_all", status_code=status.HTTP_200_OK)
+async def crawl_all(
+    background_tasks: BackgroundTasks,
+    discover: bool = Query(True, description="Найти группы на сайте перед обходом"),
+    current_user: schemas.User = Depends(auth.get_current_active_admin_user),
+):
+    """
+    Запускает в фоне обход расписания всех групп университета (только для администраторов, прогресс - в /schedule/stats).
+    """
+    if crawl_progress["running"]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Обход университета уже выполняется")
 
-            atexit.register(close_client)
-        
-        logger.info("Скрапинг завершен.")
+    async def run_crawl(discover: bool):
+        async with client_session() as client:
+            await run_university_crawl(client, discover=discover)
 
-    background_tasks.add_task(run_scraper, group_numbers, week_numbers, db)
-    return {"message": f"Парсинг расписания для групп {group_numbers}, недели {week_numbers} запущен в фоновом режиме."}
\ No newline at end of file
+    background_tasks.add_task(run_crawl, discover)
+    return {"message": "Обход расписания всех групп запущен в фоновом режиме."}
@@ -1,43 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session
 from sqlalchemy import select
-from ..database import get_session, dbm
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import dbm  # Импорт app.database создает таблицы в primary
+from ..db_runtime import get_async_read_session, get_async_session, get_write_session
 from .. import schemas, auth
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
+import asyncio
 import logging
-from contextlib import contextmanager
-from sqlalchemy import create_engine
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database setup
-DATABASE_URL = "sqlite:///./schedule.db"  # Example SQLite database URL
-ECHO = False
-
-engine = create_engine(DATABASE_URL, echo=ECHO)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def create_db() -> None:
-    """Creates the database and tables."""
-    dbm.Base.metadata.create_all(bind=engine)
-    logger.info("Database created successfully.")
-
-create_db()
-
-@contextmanager
-def get_session():
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception as e:
-        logger.error(f"Error during db operation {e}")
-        raise
-    finally:
-        db.close()
-
 router = APIRouter(
     prefix="/users",
     tags=["users"],
@@ -45,7 +21,7 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-async def create_user(user: schemas.UserCreate, db: Session = Depends(get_session)):
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_write_session)):
     """
     Создает нового пользователя (только для администраторов).
     """
@@ -68,19 +44,18 @@ async def read_users_me(current_user: schemas.User = Depends(auth.get_current_ac
     return current_user
 
 @router.get("/{user_id}", response_model=schemas.User)
-async def read_user(user_id: int, db: Session = Depends(get_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
+async def read_user(user_id: int, db: AsyncSession = Depends(get_async_read_session), current_user: schemas.User = Depends(auth.get_current_active_admin_user)):
     """
     Получает пользователя по ID (только для администраторов).
     """
     stmt = select(dbm.User).where(dbm.User.id == user_id)
-    with get_session() as db:
-        db_user = db.execute(stmt).scalar_one_or_none()
+    db_user = (await db.execute(stmt)).scalar_one_or_none()
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_session)):  # primary: пользователь мог быть создан только что
     """
     Получает JWT токен для аутентификации.
     """
@@ -97,18 +72,18 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def authenticate_user(username: str, password: str, db: Session = Depends(get_session)):
+async def authenticate_user(username: str, password: str, db: AsyncSession):
     """
     Проверяет имя пользователя и пароль в базе данных.
     """
     stmt = select(dbm.User).where(dbm.User.username == username)
-    with get_session() as db:
-        user = db.execute(stmt).scalar_one_or_none()
+    user = (await db.execute(stmt)).scalar_one_or_none()
 
-        if not user:
-            logger.warning(f"User not found: {username}")
-            return None
-        if not auth.verify_password(password, user.hashed_password):
-            logger.warning(f"Password verification failed for user: {username}")
-            return None
-        return user
\ No newline at end of file
+    if not user:
+        logger.warning(f"User not found: {username}")
+        return None
+    # bcrypt - сотни миллисекунд CPU: проверка в потоке, чтобы не задерживать остальные запросы
+    if not await asyncio.to_thread(auth.verify_password, password, user.hashed_password):
+        logger.warning(f"Password verification failed for user: {username}")
+        return None
+    return user
\ No newline at end of file
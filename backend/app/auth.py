@@ -4,7 +4,8 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from . import database, schemas, config
-from sqlalchemy.orm import Session
+from .db_runtime import get_async_session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
 
@@ -33,7 +34,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -48,9 +49,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     try:
-        with database.get_session() as session:  # Use context manager to ensure session is properly used
-            stmt = select(database.dbm.User).where(database.dbm.User.username == token_data.username)
-            user = session.execute(stmt).scalar_one_or_none()
+        # Асинхронная сессия primary: is_active / is_admin не должны отставать вместе с репликой
+        stmt = select(database.dbm.User).where(database.dbm.User.username == token_data.username)
+        user = (await session.execute(stmt)).scalar_one_or_none()
     except Exception as e:
         logger.error(f"Database error: {e}")
         raise credentials_exception
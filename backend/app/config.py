@@ -2,6 +2,19 @@ import os
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./schedule.db")
 ECHO = os.environ.get("ECHO", "False").lower() == "true"
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]  # Read replicas for GET endpoints, comma-separated; empty = read from DATABASE_URL
+
+DB_PROFILE = os.environ.get("DB_PROFILE", "performance")  # performance = pragmas / pool settings below, default = driver defaults
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")  # WAL: readers are not blocked by a writing crawl
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL in WAL mode: no fsync per commit, still crash-safe
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # Bytes of the DB file read through mmap
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 64 * 1024))  # Page cache per connection, KiB
+SQLITE_TEMP_STORE = os.environ.get("SQLITE_TEMP_STORE", "MEMORY")  # Temp tables and sort buffers in memory
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 10000))  # Wait for a lock instead of "database is locked"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))  # Server databases (Postgres): persistent pool connections
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))  # Extra connections above DB_POOL_SIZE under load
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free pool connection
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # Reconnect pooled connections older than this, s
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "YOUR_SECRET_KEY")
 ALGORITHM = "HS256"
@@ -10,4 +23,60 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 CACHE_DIR = "cache"  # Directory for cache files
 CACHE_MAX_SIZE = 256    # Maximum number of items in cache
 CACHE_TTL = 300          # Cache time-to-live in seconds
-USER_AGENT = "ScheduleParserBot/1.0"   # User-Agent string
\ No newline at end of file
+USER_AGENT = "ScheduleParserBot/1.0"   # User-Agent string
+DOWNLOAD_CACHE_BACKEND = os.environ.get("DOWNLOAD_CACHE_BACKEND", "memory")  # memory (per process) or sqlite (shared by all workers on the host)
+DOWNLOAD_CACHE_PATH = os.environ.get("DOWNLOAD_CACHE_PATH", os.path.join(CACHE_DIR, "download_cache.db"))  # SQLite file for DOWNLOAD_CACHE_BACKEND=sqlite
+DOWNLOAD_LEASE_TIMEOUT = float(os.environ.get("DOWNLOAD_LEASE_TIMEOUT", 60.0))  # How long other workers wait for a page another worker is fetching, s
+DOWNLOAD_CACHE_FRAGMENT_ONLY = os.environ.get("DOWNLOAD_CACHE_FRAGMENT_ONLY", "False").lower() == "true"  # Cache only the headline + schedule block, not the whole page
+DOWNLOAD_CACHE_COMPRESSION = os.environ.get("DOWNLOAD_CACHE_COMPRESSION", "none")  # none, zlib or zstd (needs the zstandard package)
+DOWNLOAD_CACHE_MAX_BYTES = int(os.environ.get("DOWNLOAD_CACHE_MAX_BYTES", 0))  # Memory backend size limit in bytes; 0 = CACHE_MAX_SIZE pages
+MAI_BASE_URL = os.environ.get("MAI_BASE_URL", "https://mai.ru").rstrip("/")  # Schedule site root; point at app.mai_stub for offline runs
+FIXTURE_RECORD_DIR = os.environ.get("FIXTURE_RECORD_DIR", "")  # Save every downloaded page to this fixture archive; empty = off
+DISK_CACHE_ENABLED = os.environ.get("DISK_CACHE_ENABLED", "True").lower() == "true"  # Persist pages in CACHE_DIR and revalidate with ETag/Last-Modified
+DISK_CACHE_MAX_BYTES = int(os.environ.get("DISK_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # Disk cache size limit in bytes
+DISK_CACHE_MAX_AGE = int(os.environ.get("DISK_CACHE_MAX_AGE", 7 * 24 * 3600))  # Disk cache entry lifetime in seconds
+
+DIMENSION_CACHE_SIZE = int(os.environ.get("DIMENSION_CACHE_SIZE", 10000))  # name -> id cache entries per subject/teacher/classroom/group table; 0 = off
+
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "bs4")  # HTML backend: bs4 (html.parser), lxml or selectolax
+PARSER_PARITY_CHECK = os.environ.get("PARSER_PARITY_CHECK", "False").lower() == "true"  # Compare backend output with bs4 on every page
+PARSER_STRICT = os.environ.get("PARSER_STRICT", "False").lower() == "true"  # Validate every parsed lesson with the ParsedLesson pydantic model
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))  # Parser process pool size, 0 = parse in the event loop process
+
+CRAWL_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", 8))  # Max pages scraped at the same time
+CRAWL_RATE = float(os.environ.get("CRAWL_RATE", 5.0))  # Requests per second per host (token bucket), 0 = unlimited
+CRAWL_BURST = int(os.environ.get("CRAWL_BURST", 10))  # Token bucket size (max burst of requests)
+STREAM_DOWNLOAD = os.environ.get("STREAM_DOWNLOAD", "False").lower() == "true"  # Read responses in chunks and keep only the schedule fragment
+STREAM_DRAIN_BYTES = int(os.environ.get("STREAM_DRAIN_BYTES", 64 * 1024))  # Max tail read after the fragment to keep the connection alive
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", CRAWL_CONCURRENCY * 2))  # Pages buffered between download, parse and write stages
+WRITE_BATCH_LESSONS = int(os.environ.get("WRITE_BATCH_LESSONS", 2000))  # DB writer commits after this many lessons...
+WRITE_BATCH_MS = int(os.environ.get("WRITE_BATCH_MS", 500))  # ...or this many ms after the first buffered page
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 15.0))  # httpx timeout in seconds
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", CRAWL_CONCURRENCY))  # httpx.Limits max_connections
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", CRAWL_CONCURRENCY))  # httpx.Limits max_keepalive_connections
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 120.0))  # Seconds an idle pooled connection is kept (no new DNS/TLS while it lives)
+HTTP2 = os.environ.get("HTTP2", "True").lower() == "true"  # HTTP/2 multiplexing (needs the h2 package, falls back to HTTP/1.1)
+ADAPTIVE_CONCURRENCY = os.environ.get("ADAPTIVE_CONCURRENCY", "True").lower() == "true"  # AIMD download concurrency; False = fixed CRAWL_CONCURRENCY
+ADAPTIVE_MIN_CONCURRENCY = int(os.environ.get("ADAPTIVE_MIN_CONCURRENCY", 1))  # Lower bound for the adaptive limit
+ADAPTIVE_INITIAL_CONCURRENCY = int(os.environ.get("ADAPTIVE_INITIAL_CONCURRENCY", 2))  # Starting adaptive limit
+ADAPTIVE_TARGET_P90 = float(os.environ.get("ADAPTIVE_TARGET_P90", 2.0))  # Healthy p90 download latency in seconds
+ADAPTIVE_MAX_ERROR_RATE = float(os.environ.get("ADAPTIVE_MAX_ERROR_RATE", 0.05))  # Healthy share of 5xx/429/timeouts per window
+ADAPTIVE_WINDOW = int(os.environ.get("ADAPTIVE_WINDOW", 20))  # Requests per AIMD decision
+
+SEMESTER_START = os.environ.get("SEMESTER_START", "")  # ISO date of week 1 (e.g. 2025-09-01); empty = Sep 1 / Feb 1 heuristic
+SEMESTER_WEEKS = 18  # Weeks per semester on the MAI site
+REFRESH_CURRENT_WEEK = int(os.environ.get("REFRESH_CURRENT_WEEK", 3600))  # Refresh interval (s) for the current and next week
+REFRESH_NEAR_WEEKS = int(os.environ.get("REFRESH_NEAR_WEEKS", 24 * 3600))  # Refresh interval (s) for weeks up to REFRESH_NEAR_DISTANCE ahead
+REFRESH_FAR_WEEKS = int(os.environ.get("REFRESH_FAR_WEEKS", 7 * 24 * 3600))  # Refresh interval (s) for distant future weeks
+REFRESH_NEAR_DISTANCE = int(os.environ.get("REFRESH_NEAR_DISTANCE", 3))  # How many weeks ahead count as "near"
+REFRESH_JITTER = float(os.environ.get("REFRESH_JITTER", 0.1))  # Random +-share added to each refresh interval to spread the load
+CRAWL_CLAIM_BATCH = int(os.environ.get("CRAWL_CLAIM_BATCH", CRAWL_CONCURRENCY * 4))  # Frontier pages leased per claim
+CRAWL_LEASE_TTL = float(os.environ.get("CRAWL_LEASE_TTL", 120))  # Seconds a claimed page stays leased without a heartbeat
+CRAWL_HEARTBEAT = float(os.environ.get("CRAWL_HEARTBEAT", 30))  # Seconds between lease renewals of claimed pages
+CRAWL_IDLE_SLEEP = float(os.environ.get("CRAWL_IDLE_SLEEP", 5))  # crawl_worker poll interval when nothing is due
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "False").lower() == "true"  # Run the refresh scheduler in the app lifespan (opt-in: it crawls mai.ru on start)
+SCHEDULER_TICK = float(os.environ.get("SCHEDULER_TICK", 60))  # Seconds between checks for due pages (jittered)
+SCHEDULER_LEASE_TTL = float(os.environ.get("SCHEDULER_LEASE_TTL", 300))  # Scheduler lease lifetime (s); renewed while held
+SCHEDULER_DISCOVER_INTERVAL = int(os.environ.get("SCHEDULER_DISCOVER_INTERVAL", 24 * 3600))  # Seconds between group discovery runs, 0 = never
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", 100))  # Finished force_parse jobs kept for GET /schedule/jobs/{id}
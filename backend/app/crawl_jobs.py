@@ -0,0 +1,168 @@
+# backend/app/crawl_jobs.py
+"""
+Реестр фоновых задач парсинга (force_parse).
+
+Повторный запрос тех же групп и недель, пока задача выполняется, не запускает второй
+обход, а возвращает уже идущую задачу. Прогресс и результат задачи хранятся в памяти
+процесса: последние JOB_HISTORY задач доступны через GET /schedule/jobs/{id}.
+"""
+import asyncio
+import datetime
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from . import config
+from .scraper import PAGE_UPLOADED, PAGE_UNCHANGED, PAGE_EMPTY, PAGE_FAILED
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+JobKey = Tuple[Tuple[str, ...], Tuple[int, ...]]
+
+
+class CrawlJob:
+    """
+    Задача парсинга набора (группы x недели).
+
+    Счетчики страниц: done - обработано всего, uploaded - расписание сохранено,
+    cached - страница не изменилась с прошлой загрузки (в БД уже актуальные данные),
+    skipped - на странице нет уроков, failed - не удалось загрузить или разобрать.
+    """
+
+    def __init__(self, key: JobKey):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.group_numbers, self.week_numbers = key
+        self.status = JOB_RUNNING
+        self.error: Optional[str] = None
+        self.created_at = datetime.datetime.now()
+        self.finished_at: Optional[datetime.datetime] = None
+        self.requests = 1  # Сколько запросов объединено в задачу
+        self.pages_total = len(self.group_numbers) * len(self.week_numbers)
+        self.counts = {"done": 0, "uploaded": 0, "cached": 0, "skipped": 0, "failed": 0}
+        self.task: Optional[asyncio.Task] = None
+        self._started = time.monotonic()
+        self._elapsed: Optional[float] = None
+
+    def on_page_done(self, group_number: str, week_number: int, result: str) -> None:
+        self.counts["done"] += 1
+        if result == PAGE_UPLOADED:
+            self.counts["uploaded"] += 1
+        elif result == PAGE_UNCHANGED:
+            self.counts["cached"] += 1
+        elif result == PAGE_EMPTY:
+            self.counts["skipped"] += 1
+        elif result == PAGE_FAILED:
+            self.counts["failed"] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed if self._elapsed is not None else time.monotonic() - self._started
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.datetime.now()
+        self._elapsed = time.monotonic() - self._started
+
+    def to_dict(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "id": self.id,
+            "status": self.status,
+            "group_numbers": list(self.group_numbers),
+            "week_numbers": list(self.week_numbers),
+            "requests": self.requests,
+            "pages_total": self.pages_total,
+            **{f"pages_{name}": count for name, count in self.counts.items()},
+            "elapsed_seconds": round(elapsed, 2),
+            "pages_per_second": round(self.counts["done"] / elapsed, 2) if elapsed > 0 else 0.0,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+_running: Dict[JobKey, CrawlJob] = {}
+
+
+def job_key(group_numbers: Sequence[str], week_numbers: Sequence[int]) -> JobKey:
+    """Ключ объединения: порядок и повторы групп и недель не важны."""
+    return tuple(sorted(set(group_numbers))), tuple(sorted(set(week_numbers)))
+
+
+def _forget_old_jobs() -> None:
+    finished = [job_id for job_id, job in jobs.items() if job.status != JOB_RUNNING]
+    for job_id in finished[:max(len(finished) - config.JOB_HISTORY, 0)]:
+        del jobs[job_id]
+
+
+async def _run(job: CrawlJob, run: Callable[[CrawlJob], Awaitable[None]]) -> None:
+    try:
+        await run(job)
+        job.finish(JOB_COMPLETED)
+        logger.info(f"Задача парсинга {job.id} завершена: {job.counts}")
+    except asyncio.CancelledError:
+        job.finish(JOB_CANCELLED)
+        logger.info(f"Задача парсинга {job.id} отменена: {job.counts}")
+        raise  # Отмена видна и тому, кто ждет задачу
+    except Exception as e:
+        job.finish(JOB_FAILED, str(e))
+        logger.error(f"Задача парсинга {job.id} завершилась с ошибкой: {e}")
+    finally:
+        _running.pop(job.key, None)
+        _forget_old_jobs()
+
+
+def _on_task_done(job: CrawlJob, task: asyncio.Task) -> None:
+    if job.status == JOB_RUNNING:  # Задачу отменили до того, как она начала выполняться
+        job.finish(JOB_CANCELLED)
+        _running.pop(job.key, None)
+
+
+def submit_job(group_numbers: Sequence[str], week_numbers: Sequence[int],
+               run: Callable[[CrawlJob], Awaitable[None]]) -> Tuple[CrawlJob, bool]:
+    """
+    Запускает run(job) в фоне или присоединяется к уже идущей задаче с теми же группами и неделями.
+
+    Returns:
+        (задача, True - если запущена новая задача).
+    """
+    key = job_key(group_numbers, week_numbers)
+    job = _running.get(key)
+    if job is not None:
+        job.requests += 1
+        return job, False
+    job = CrawlJob(key)
+    jobs[job.id] = job
+    _running[key] = job
+    job.task = asyncio.create_task(_run(job, run))
+    job.task.add_done_callback(lambda task: _on_task_done(job, task))
+    return job, True
+
+
+def get_job(job_id: str) -> Optional[CrawlJob]:
+    return jobs.get(job_id)
+
+
+async def cancel_running_jobs() -> None:
+    """Отменяет все выполняющиеся задачи и дожидается их (при остановке приложения)."""
+    tasks = [job.task for job in _running.values() if job.task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def cancel_job(job_id: str) -> Optional[CrawlJob]:
+    """Отменяет задачу; уже сохраненные страницы остаются в БД."""
+    job = jobs.get(job_id)
+    if job is not None and job.status == JOB_RUNNING and job.task is not None:
+        job.task.cancel()
+    return job
@@ -0,0 +1,91 @@
+# backend/app/crawl_worker.py
+"""
+Отдельный воркер обхода расписания.
+
+Берет страницы (группа, неделя) из общей таблицы crawl_frontier в аренду порциями
+(claim_due_pages), обрабатывает их конвейером скрапера и продлевает аренду heartbeat'ом.
+Страницы упавшего воркера снова становятся доступны, когда истекает аренда (CRAWL_LEASE_TTL).
+Несколько воркеров на разных хостах с одной БД (DATABASE_URL) делят обход между собой.
+
+Очередь заполняется обходом университета (python -m app.university_crawl, POST /schedule/crawl_all)
+или ключом --discover. По завершении воркер печатает в stdout итог в JSON.
+
+Запуск: python -m app.crawl_worker [--discover] [--exit-when-idle] [--worker-id host-1]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import time
+import httpx
+from . import config, database
+from .parsers.group_discovery import discover_groups
+from .parsers.schedule_downloader import create_client
+from .scraper import PAGE_FAILED
+from .semester import current_week_number
+from .university_crawl import WORKER_ID, seed_frontier, crawl_claimed_pages, count_due_pages, count_leased_pages
+
+logger = logging.getLogger(__name__)
+
+# Прогресс воркера с момента запуска
+worker_progress = {
+    "worker_id": WORKER_ID,
+    "started_at": None,
+    "pages_done": 0,
+    "pages_failed": 0,
+    "pages_per_second": 0.0,
+}
+
+
+async def run_worker(client: httpx.AsyncClient, worker_id: str = WORKER_ID, exit_when_idle: bool = False) -> dict:
+    """
+    Обрабатывает страницы из crawl_frontier, пока не остановят.
+
+    Args:
+        client: httpx.AsyncClient session.
+        worker_id: Владелец аренды страниц; должен быть уникален среди воркеров.
+        exit_when_idle: Завершиться, когда не осталось ни страниц, которые пора обновить,
+            ни страниц в аренде у других воркеров (их аренда может истечь).
+
+    Returns:
+        Итоговый прогресс воркера (worker_progress).
+    """
+    worker_progress.update(worker_id=worker_id, started_at=datetime.datetime.now().isoformat(),
+                           pages_done=0, pages_failed=0, pages_per_second=0.0)
+    started = time.monotonic()
+
+    def on_page_done(result: str) -> None:
+        worker_progress["pages_done"] += 1
+        if result == PAGE_FAILED:
+            worker_progress["pages_failed"] += 1
+        worker_progress["pages_per_second"] = round(worker_progress["pages_done"] / (time.monotonic() - started), 2)
+
+    logger.info(f"Воркер обхода {worker_id} запущен")
+    while True:
+        await crawl_claimed_pages(client, current_week_number(), worker_id, on_page_done)
+        if await asyncio.to_thread(count_due_pages):
+            continue
+        if exit_when_idle and not await asyncio.to_thread(count_leased_pages):
+            break
+        await asyncio.sleep(config.CRAWL_IDLE_SLEEP)
+    logger.info(f"Воркер обхода {worker_id} завершен: {worker_progress['pages_done']} страниц, "
+                f"ошибок {worker_progress['pages_failed']}")
+    return worker_progress
+
+
+async def _main(args: argparse.Namespace) -> None:
+    database.warm_dimension_cache()
+    async with create_client() as client:
+        if args.discover:
+            await asyncio.to_thread(seed_frontier, await discover_groups(client))
+        await run_worker(client, args.worker_id, args.exit_when_idle)
+    print(json.dumps(worker_progress, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер обхода расписания МАИ (общая очередь crawl_frontier)")
+    parser.add_argument("--worker-id", default=WORKER_ID, help="владелец аренды страниц (по умолчанию хост-pid-случайный суффикс)")
+    parser.add_argument("--discover", action="store_true", help="перед обходом найти группы на сайте и добавить в очередь")
+    parser.add_argument("--exit-when-idle", action="store_true", help="завершиться, когда очередь пуста")
+    asyncio.run(_main(parser.parse_args()))
@@ -1,11 +1,15 @@
-from sqlalchemy import create_engine, DateTime, Date, func, select
-from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy import event, inspect, text, bindparam, func, DateTime, Date, select, insert, update, delete
+from sqlalchemy.orm import declarative_base, Session
 from sqlalchemy.exc import IntegrityError
 from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
 import datetime
 import logging
 from . import config
 from . import db_models as dbm
+from . import lesson_queries
+from .db_runtime import primary_engine, SessionLocal
+from .dimension_cache import DimensionCache
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -14,19 +18,68 @@ logger = logging.getLogger(__name__)
 DATABASE_URL = config.DATABASE_URL
 ECHO = config.ECHO
 
-engine = create_engine(DATABASE_URL, echo=ECHO)
+engine = primary_engine  # Общий на процесс, см. db_runtime
 
 Base = declarative_base()
 
+def _add_missing_columns() -> None:
+    """Добавляет в существующие таблицы новые nullable-колонки моделей (create_all их не добавляет)."""
+    inspector = inspect(engine)
+    for table in dbm.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"В таблицу {table.name} добавлена колонка {column.name}")
+
+# Индексы прежних схем, которых больше нет в моделях
+STALE_INDEXES = (
+    'ix_teachers_name',  # Неуникальный, заменен uq_teachers_name
+    'ix_lessons_teacher_start',  # Расписание преподавателя за день: запрос удален, вызовов не было
+)
+
+def ensure_indexes(bind=None) -> None:
+    """
+    Создает индексы моделей, которых нет в существующих таблицах (create_all их не добавляет),
+    и удаляет STALE_INDEXES.
+    """
+    bind = bind or engine
+    for table in dbm.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+    with bind.begin() as conn:
+        for name in STALE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def _merge_duplicate_teachers() -> None:
+    """Сливает преподавателей с одинаковым именем в запись с меньшим id (до создания uq_teachers_name)."""
+    teachers, lessons = dbm.Teacher.__table__, dbm.Lesson.__table__
+    with engine.begin() as conn:
+        duplicates = conn.execute(
+            select(teachers.c.name, func.min(teachers.c.id)).group_by(teachers.c.name).having(func.count() > 1)
+        ).all()
+        for name, keep_id in duplicates:
+            extra_ids = select(teachers.c.id).where(teachers.c.name == name, teachers.c.id != keep_id)
+            conn.execute(update(lessons).where(lessons.c.teacher_id.in_(extra_ids)).values(teacher_id=keep_id))
+            conn.execute(delete(teachers).where(teachers.c.name == name, teachers.c.id != keep_id))
+        if duplicates:
+            logger.info(f"Объединены дубликаты преподавателей: {len(duplicates)} имен")
+
 def create_db() -> None:
     """Создает базу данных и таблицы."""
     try:
         dbm.Base.metadata.create_all(engine)
+        _add_missing_columns()
+        _merge_duplicate_teachers()
+        ensure_indexes()
         logger.info("База данных успешно создана.")
     except Exception as e:
         logger.error(f"Ошибка при создании базы данных: {e}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @contextmanager
 def get_session():
@@ -44,6 +97,45 @@ def get_session():
 
 create_db()
 
+# Кэш name -> id справочников урока (см. resolve_names)
+DIMENSION_MODELS = (dbm.Subject, dbm.Teacher, dbm.Classroom, dbm.Group)
+dimension_cache = DimensionCache(config.DIMENSION_CACHE_SIZE)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_pending_dimension_ids(session: Session) -> None:
+    """Write-through: id справочников, добавленных в транзакции, попадают в кэш после commit."""
+    for model, ids in session.info.pop("pending_dimension_ids", []):
+        dimension_cache.put(model, ids)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending_dimension_ids(session: Session) -> None:
+    session.info.pop("pending_dimension_ids", None)
+
+
+def _invalidate_dimension(mapper, connection, target) -> None:
+    """Изменение или удаление предмета/преподавателя/аудитории/группы через ORM (например, из API)."""
+    dimension_cache.invalidate(type(target), target.id)
+
+
+for _model in DIMENSION_MODELS:
+    event.listen(_model, "after_update", _invalidate_dimension)
+    event.listen(_model, "after_delete", _invalidate_dimension)
+
+
+def warm_dimension_cache() -> None:
+    """Заполняет кэш справочников последними DIMENSION_CACHE_SIZE записями каждой таблицы."""
+    if config.DIMENSION_CACHE_SIZE <= 0:
+        return
+    with get_session() as session:
+        for model in DIMENSION_MODELS:
+            rows = session.execute(
+                select(model.name, model.id).order_by(model.id.desc()).limit(config.DIMENSION_CACHE_SIZE)
+            ).all()
+            dimension_cache.put(model, dict(reversed(rows)))  # Самые новые - последними, т.е. свежими для LRU
+    logger.info(f"Кэш справочников прогрет: {dimension_cache.sizes()}")
+
 # Функции для добавления данных
 def add_subject(session: Session, name: str) -> dbm.Subject:
     """Adds a subject if it doesn't exist."""
@@ -74,14 +166,15 @@ def add_teacher(session: Session, name: str) -> dbm.Teacher:
 def add_classroom(session: Session, name: str) -> dbm.Classroom:
     """Adds a classroom if it doesn't exist."""
     stmt = select(dbm.Classroom).filter_by(name=name)
-    existing_classroom = session.execute(stmt).scalar_one_or_none()
-    if existing_classroom:
-        logger.info(f"Classroom '{name}' already exists.")
-        return existing_classroom
-    classroom = dbm.Classroom(name=name)
-    session.add(classroom)
-    logger.info(f"Classroom '{name}' added.")
-    return classroom
+    with get_session() as session:
+        existing_classroom = session.execute(stmt).scalar_one_or_none()
+        if existing_classroom:
+            logger.info(f"Classroom '{name}' already exists.")
+            return existing_classroom
+        classroom = dbm.Classroom(name=name)
+        session.add(classroom)
+        logger.info(f"Classroom '{name}' added.")
+        return classroom
 
 def add_group(session: Session, name: str) -> dbm.Group:
     """Adds a group if it doesn't exist."""
@@ -147,11 +240,7 @@ def add_or_update_lesson(session: Session, subject: dbm.Subject, teacher: dbm.Te
 
 def delete_lessons_by_group_and_date_range(session: Session, group: dbm.Group, start_date: Date, end_date: Date) -> None:
     """Deletes lessons for a group within a date range."""
-    stmt = select(dbm.Lesson).where(
-        dbm.Lesson.group_id == group.id,
-        func.date(dbm.Lesson.start_time) >= start_date,
-        func.date(dbm.Lesson.start_time) <= end_date
-    )
+    stmt = lesson_queries.group_lessons_in_range(group.id, start_date, end_date)
     
     with get_session() as session:
         lessons_to_delete = session.execute(stmt).scalars().all()
@@ -165,21 +254,95 @@ def delete_lessons_by_group_and_date_range(session: Session, group: dbm.Group, s
             session.rollback()
             logger.error(f"Error while deleting lessons: {e}")
 
+# Пакетная загрузка уроков: справочники разрешаются несколькими IN (...) запросами,
+# изменения уроков пишутся executemany в транзакции вызывающего кода.
+
+IN_CHUNK_SIZE = 500  # Имен в одном IN (...): меньше лимита переменных SQLite (999 в старых версиях)
+
+
+def _insert_ignoring_conflicts(model):
+    """INSERT ... ON CONFLICT DO NOTHING, если диалект это поддерживает (гонка двух загрузчиков)."""
+    if engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+def _select_ids_by_name(session: Session, model, names: List[str]) -> Dict[str, int]:
+    ids = {}
+    for start in range(0, len(names), IN_CHUNK_SIZE):
+        chunk = names[start:start + IN_CHUNK_SIZE]
+        ids.update(session.execute(select(model.name, model.id).where(model.name.in_(chunk))).all())
+    return ids
+
+
+def resolve_names(session: Session, model, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Возвращает {name: id} для справочника (Subject, Teacher, Classroom, Group),
+    добавляя недостающие имена одним пакетным INSERT. Известные имена берутся
+    из dimension_cache без запроса к БД; найденные в БД попадают в кэш только после commit:
+    SELECT внутри транзакции видит и ее незафиксированные вставки.
+    """
+    ids, unknown = dimension_cache.lookup(model, set(names))
+    if not unknown:
+        return ids
+    pending = session.info.setdefault("pending_dimension_ids", [])
+    found = _select_ids_by_name(session, model, sorted(unknown))
+    ids.update(found)
+    pending.append((model, found))
+    missing = sorted(name for name in unknown if name not in found)
+    if missing:
+        session.execute(_insert_ignoring_conflicts(model), [{"name": name} for name in missing])
+        added = _select_ids_by_name(session, model, missing)
+        ids.update(added)
+        pending.append((model, added))
+        logger.info(f"{model.__name__}: добавлено {len(missing)} новых записей.")
+    return ids
+
+
+# Поля урока, которые сравниваются при синхронизации (ключ - group_id, start_time)
+LESSON_SYNC_FIELDS = ('subject_id', 'teacher_id', 'classroom_id', 'end_time', 'lesson_type')
+
+
+def load_group_lessons_in_range(session: Session, group_id: int, start_date: Date, end_date: Date) -> list:
+    """Уроки группы за даты [start_date, end_date]: строки (id, start_time, *LESSON_SYNC_FIELDS)."""
+    columns = [getattr(dbm.Lesson, field) for field in LESSON_SYNC_FIELDS]
+    return session.execute(
+        lesson_queries.group_lessons_in_range(group_id, start_date, end_date,
+                                              dbm.Lesson.id, dbm.Lesson.start_time, *columns)
+    ).all()
+
+
+def bulk_update_lessons(session: Session, lessons: List[dict]) -> None:
+    """UPDATE по первичному ключу одним executemany (в каждом словаре есть id)."""
+    if lessons:
+        session.execute(update(dbm.Lesson), lessons)
+
+
+def delete_lessons_by_ids(session: Session, lesson_ids: List[int]) -> None:
+    for start in range(0, len(lesson_ids), IN_CHUNK_SIZE):
+        session.execute(delete(dbm.Lesson).where(dbm.Lesson.id.in_(lesson_ids[start:start + IN_CHUNK_SIZE])))
+
+
+def bulk_insert_lessons(session: Session, lessons: List[dict]) -> None:
+    """Вставляет уроки одним executemany; урок с уже занятым (group_id, start_time) пропускается."""
+    if lessons:
+        session.execute(_insert_ignoring_conflicts(dbm.Lesson), lessons)
+
+
 def get_lessons_by_subject(session: Session, subject_name: str):
     """Gets lessons by subject name."""
-    stmt = select(dbm.Lesson).join(dbm.Subject).where(dbm.Subject.name == subject_name)
+    stmt = lesson_queries.lessons_by_subject(subject_name)
     with get_session() as session:
         lessons = session.execute(stmt).scalars().all()
         return lessons
 
 def get_classroom_schedule(session: Session, classroom_name: str, date: Date):
     """Gets classroom schedule for a given date."""
-    start_of_day = datetime.datetime.combine(date, datetime.time.min)
-    end_of_day = datetime.datetime.combine(date, datetime.time.max)
-    stmt = select(dbm.Lesson).join(dbm.Classroom).where(
-        dbm.Classroom.name == classroom_name,
-        dbm.Lesson.start_time.between(start_of_day, end_of_day)
-    )
+    stmt = lesson_queries.classroom_schedule(classroom_name, date)
     with get_session() as session:
         lessons = session.execute(stmt).scalars().all()
         return lessons
@@ -211,4 +374,70 @@ def delete_lesson(session: Session, lesson_id: int) -> None:
         logger.info(f"Lesson with ID '{lesson_id}' deleted.")
         session.commit()
     else:
-        logger.warning(f"Lesson with ID '{lesson_id}' not found.")
\ No newline at end of file
+        logger.warning(f"Lesson with ID '{lesson_id}' not found.")
+
+def get_page_digest(group_name: str, week_number: int) -> Optional[str]:
+    """Returns the stored page digest without touching checked_at (read-only check for the crawl pipeline)."""
+    stmt = select(dbm.PageDigest.digest).filter_by(group_name=group_name, week_number=week_number)
+    with get_session() as session:
+        return session.execute(stmt).scalar_one_or_none()
+
+def record_page_digests(session: Session, saved: List[Tuple[str, int, str]], checked: List[Tuple[str, int]]) -> None:
+    """Stores digests of uploaded pages and the check time of unchanged ones in the caller's transaction."""
+    now = datetime.datetime.now()
+    if saved:
+        wanted = {(group_name, week_number): digest for group_name, week_number, digest in saved}
+        pages = session.execute(
+            select(dbm.PageDigest).where(dbm.PageDigest.group_name.in_({group_name for group_name, _ in wanted}))
+        ).scalars()
+        for page in pages:
+            digest = wanted.pop((page.group_name, page.week_number), None)
+            if digest is not None:
+                page.digest = digest
+                page.checked_at = now
+                page.changed_at = now
+        session.add_all(dbm.PageDigest(group_name=group_name, week_number=week_number, digest=digest,
+                                       checked_at=now, changed_at=now)
+                        for (group_name, week_number), digest in wanted.items())
+    if checked:
+        table = dbm.PageDigest.__table__
+        session.execute(
+            update(table).where(table.c.group_name == bindparam('page_group'), table.c.week_number == bindparam('page_week'))
+            .values(checked_at=now),
+            [{"page_group": group_name, "page_week": week_number} for group_name, week_number in checked],
+        )
+
+
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """
+    Берет или продлевает аренду name на ttl секунд.
+
+    Аренда достается owner, если она свободна, истекла или уже принадлежит ему;
+    так из нескольких экземпляров приложения задачу выполняет только один.
+    """
+    now = datetime.datetime.now()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    with get_session() as session:
+        result = session.execute(
+            update(dbm.SchedulerLease)
+            .where(dbm.SchedulerLease.name == name)
+            .where((dbm.SchedulerLease.owner == owner) | (dbm.SchedulerLease.expires_at <= now))
+            .values(owner=owner, expires_at=expires_at)
+        )
+        if result.rowcount:
+            return True
+        if session.get(dbm.SchedulerLease, name) is not None:  # Аренду держит другой экземпляр
+            return False
+    try:
+        with get_session() as session:
+            session.add(dbm.SchedulerLease(name=name, owner=owner, expires_at=expires_at))
+        return True
+    except IntegrityError:  # Другой экземпляр успел взять аренду первым
+        return False
+
+
+def release_lease(name: str, owner: str) -> None:
+    with get_session() as session:
+        session.execute(
+            delete(dbm.SchedulerLease).where(dbm.SchedulerLease.name == name, dbm.SchedulerLease.owner == owner)
+        )
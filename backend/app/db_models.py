@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -37,6 +37,10 @@ class Teacher(Base):
     def __repr__(self):
         return f"<Teacher(name='{self.name}')>"
 
+    # Уникальный индекс, а не unique=True у колонки: в существующие базы его добавляет ensure_indexes.
+    # Имя - ключ справочника (resolve_names), на нем срабатывает ON CONFLICT DO NOTHING параллельных писателей
+    __table_args__ = (Index('uq_teachers_name', 'name', unique=True),)
+
 class Classroom(Base):
     __tablename__ = 'classrooms'
     id = Column(Integer, primary_key=True)
@@ -77,8 +81,60 @@ class Lesson(Base):
     group = relationship("Group", back_populates="lessons") # Связь с группой (одна группа для одного урока)
 
     __table_args__ = (
-        UniqueConstraint('group_id', 'start_time', name='unique_lesson'),
+        UniqueConstraint('group_id', 'start_time', name='unique_lesson'),  # Расписание группы за период
+        Index('ix_lessons_classroom_start', 'classroom_id', 'start_time'),  # Занятость аудитории
+        Index('ix_lessons_subject_start', 'subject_id', 'start_time'),  # Уроки предмета
     )
 
     def __repr__(self):
-        return f"<Lesson(subject='{self.subject.name}', start_time='{self.start_time}')>"
\ No newline at end of file
+        return f"<Lesson(subject='{self.subject.name}', start_time='{self.start_time}')>"
+
+
+class PageDigest(Base):
+    __tablename__ = 'page_digests'
+    id = Column(Integer, primary_key=True)
+    group_name = Column(String, nullable=False)  # Номер группы, как он передан в запрос к сайту
+    week_number = Column(Integer, nullable=False)
+    digest = Column(String, nullable=False)  # Дайджест нормализованного фрагмента расписания
+    checked_at = Column(DateTime, nullable=False)  # Последняя загрузка страницы
+    changed_at = Column(DateTime, nullable=False)  # Последнее изменение содержимого
+
+    __table_args__ = (
+        UniqueConstraint('group_name', 'week_number', name='unique_page_digest'),
+    )
+
+    def __repr__(self):
+        return f"<PageDigest(group_name='{self.group_name}', week_number={self.week_number})>"
+
+
+class CrawlFrontier(Base):
+    __tablename__ = 'crawl_frontier'
+    id = Column(Integer, primary_key=True)
+    group_name = Column(String, nullable=False)
+    week_number = Column(Integer, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)  # Меньше - раньше (текущая и следующая недели первыми)
+    status = Column(String, nullable=False, default='pending')  # pending / in_progress
+    lease_owner = Column(String, nullable=True)  # Воркер, взявший страницу в работу
+    lease_expires_at = Column(DateTime, nullable=True)  # Аренда продлевается heartbeat'ом; истекшую берет другой воркер
+    next_due_at = Column(DateTime, nullable=True)  # Когда обновить страницу; NULL - больше не обновлять
+    last_crawled_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)  # Неудачных попыток подряд
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('group_name', 'week_number', name='unique_frontier_page'),
+        Index('ix_crawl_frontier_due', 'status', 'priority', 'next_due_at'),
+    )
+
+    def __repr__(self):
+        return f"<CrawlFrontier(group_name='{self.group_name}', week_number={self.week_number}, status='{self.status}')>"
+
+
+class SchedulerLease(Base):
+    __tablename__ = 'scheduler_leases'
+    name = Column(String, primary_key=True)  # Имя задачи, например 'refresh_scheduler'
+    owner = Column(String, nullable=False)  # Экземпляр приложения, держащий аренду
+    expires_at = Column(DateTime, nullable=False)  # Аренда свободна после этого времени
+
+    def __repr__(self):
+        return f"<SchedulerLease(name='{self.name}', owner='{self.owner}')>"
@@ -0,0 +1,76 @@
+# backend/app/db_profile.py
+"""
+Профиль производительности подключения к БД (DB_PROFILE).
+
+performance - для SQLite на каждое новое соединение выполняются PRAGMA из config
+(WAL, synchronous, mmap_size, cache_size, temp_store, busy_timeout), для серверных БД
+(Postgres) - настройки пула из тех же DB_POOL_*. default - умолчания драйвера и SQLAlchemy.
+"""
+import logging
+from typing import Dict, List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from . import config
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("default", "performance")
+
+
+def _check_profile(profile: str) -> None:
+    if profile not in PROFILES:
+        raise ValueError(f"Неизвестный DB_PROFILE: {profile!r} (ожидается default или performance)")
+
+
+def sqlite_pragmas(profile: str = config.DB_PROFILE) -> List[str]:
+    """PRAGMA, выполняемые на каждом новом соединении SQLite."""
+    _check_profile(profile)
+    if profile == "default":
+        return []
+    return [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}",  # Отрицательное значение - в KiB, а не в страницах
+        f"PRAGMA temp_store={config.SQLITE_TEMP_STORE}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+def engine_options(url: str, profile: str = config.DB_PROFILE) -> Dict:
+    """Аргументы create_engine для профиля: пул - только для серверных БД."""
+    _check_profile(profile)
+    if profile == "default" or make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,  # Соединение, закрытое сервером или балансировщиком, заменяется до запроса
+    }
+
+
+def apply_profile(engine, profile: str = config.DB_PROFILE):
+    """Подписывает engine (Engine или AsyncEngine) на connect: PRAGMA профиля выполняются на каждом новом соединении SQLite."""
+    if engine.dialect.name != "sqlite":
+        return engine
+    pragmas = sqlite_pragmas(profile)
+    if pragmas:
+        # У AsyncEngine события соединений вешаются на sync_engine; aiosqlite дает синхронный курсор-адаптер
+        @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+    return engine
+
+
+def create_profiled_engine(url: str, echo: bool = False, profile: str = config.DB_PROFILE, **kwargs) -> Engine:
+    """create_engine с настройками профиля DB_PROFILE."""
+    engine = create_engine(url, echo=echo, **{**engine_options(url, profile), **kwargs})
+    logger.info(f"Подключение к БД {engine.dialect.name}, профиль {profile}")
+    return apply_profile(engine, profile)
@@ -0,0 +1,101 @@
+# backend/app/db_runtime.py
+"""
+Подключения к БД процесса: primary-движок для записи и пул read-replica для чтения.
+
+Все точки входа (API, create_admin.py, обход и воркеры) берут engine и сессии отсюда: на процесс
+один пул соединений к primary и по одному к каждой реплике. DATABASE_REPLICA_URLS - реплики
+через запятую (например, streaming replication Postgres). Чтение GET-эндпоинтов распределяется
+по репликам по кругу, без реплик идет в primary; запись - всегда в primary. Реплика может
+отставать, поэтому то, что читается сразу после записи (вход по паролю, ответ POST), и проверка
+токена (is_active / is_admin пускают к записи) идут в primary.
+
+Асинхронные движки (aiosqlite для SQLite, asyncpg для Postgres) открывают те же URL; PRAGMA
+и настройки пула - из DB_PROFILE. Они создаются при первом асинхронном запросе, поэтому
+синхронные входы (воркер обхода, create_admin.py) не требуют асинхронного драйвера.
+"""
+import itertools
+import logging
+from typing import AsyncIterator, Dict, Iterator
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from . import config
+from .db_profile import apply_profile, create_profiled_engine, engine_options
+
+logger = logging.getLogger(__name__)
+
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_url(url: str) -> str:
+    """sqlite:///... -> sqlite+aiosqlite:///..., postgresql(+psycopg2)://... -> postgresql+asyncpg://..."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для {backend!r} (поддерживаются sqlite и postgresql)")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+primary_engine = create_profiled_engine(config.DATABASE_URL, echo=config.ECHO)  # PRAGMA / пул по DB_PROFILE
+if config.DATABASE_REPLICA_URLS:
+    logger.info(f"Реплик для чтения: {len(config.DATABASE_REPLICA_URLS)}")
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=primary_engine)
+AsyncSessionLocal = sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)  # bind - при открытии
+
+_async_engines: Dict[str, AsyncEngine] = {}  # URL -> асинхронный движок
+_replica_order = itertools.cycle(config.DATABASE_REPLICA_URLS) if config.DATABASE_REPLICA_URLS else None
+
+
+def async_engine(url: str = config.DATABASE_URL) -> AsyncEngine:
+    """Асинхронный движок для url (по умолчанию primary), создается при первом обращении."""
+    engine = _async_engines.get(url)
+    if engine is None:
+        engine = apply_profile(create_async_engine(async_url(url), echo=config.ECHO, **engine_options(url)))
+        _async_engines[url] = engine
+    return engine
+
+
+def async_read_engine() -> AsyncEngine:
+    """Движок для чтения: следующая реплика по кругу или primary, если реплик нет."""
+    return async_engine(next(_replica_order)) if _replica_order is not None else async_engine()
+
+
+def get_write_session() -> Iterator[Session]:
+    """Зависимость FastAPI для записи: синхронная сессия primary (commit при успехе, rollback при ошибке)."""
+    with SessionLocal() as session:
+        try:
+            yield session
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if isinstance(e, SQLAlchemyError):  # HTTPException обработчика тоже приходит сюда - это не ошибка БД
+                logger.error(f"Ошибка при работе с базой данных: {e}")
+            raise
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Зависимость FastAPI: асинхронная сессия primary (commit при успехе, rollback при ошибке)."""
+    async with AsyncSessionLocal(bind=async_engine()) as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            if isinstance(e, SQLAlchemyError):
+                logger.error(f"Ошибка при работе с базой данных: {e}")
+            raise
+
+
+async def get_async_read_session() -> AsyncIterator[AsyncSession]:
+    """Зависимость FastAPI для GET-эндпоинтов: асинхронная сессия реплики (без реплик - primary)."""
+    async with AsyncSessionLocal(bind=async_read_engine()) as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    """Закрывает пулы всех движков (при остановке приложения, до остановки event loop)."""
+    while _async_engines:
+        await _async_engines.popitem()[1].dispose()
+    primary_engine.dispose()
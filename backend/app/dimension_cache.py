@@ -0,0 +1,68 @@
+# backend/app/dimension_cache.py
+import logging
+import threading
+from typing import Dict, Iterable, Tuple
+import cachetools
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionCache:
+    """
+    Кэш name -> id справочников урока (Subject, Teacher, Classroom, Group) на процесс.
+
+    На каждую таблицу свой LRUCache размером maxsize. Кэшируются только закоммиченные
+    строки: id, добавленные в незавершенной транзакции, попадают в кэш после commit
+    (см. database._apply_pending_dimension_ids), при rollback - отбрасываются.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._caches: Dict[str, cachetools.LRUCache] = {}
+        self._lock = threading.Lock()  # Запись идет и из to_thread, и из event loop
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def _cache(self, model) -> cachetools.LRUCache:
+        cache = self._caches.get(model.__tablename__)
+        if cache is None:
+            cache = self._caches[model.__tablename__] = cachetools.LRUCache(maxsize=self.maxsize)
+        return cache
+
+    def lookup(self, model, names: Iterable[str]) -> Tuple[Dict[str, int], set]:
+        """Возвращает (найденные {name: id}, имена, которых нет в кэше)."""
+        found, unknown = {}, set()
+        with self._lock:
+            cache = self._cache(model)
+            for name in names:
+                dimension_id = cache.get(name)
+                if dimension_id is None:
+                    unknown.add(name)
+                else:
+                    found[name] = dimension_id
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(unknown)
+        return found, unknown
+
+    def put(self, model, ids: Dict[str, int]) -> None:
+        if self.maxsize <= 0:  # Кэш выключен
+            return
+        with self._lock:
+            cache = self._cache(model)
+            for name, dimension_id in ids.items():
+                cache[name] = dimension_id
+
+    def invalidate(self, model=None, dimension_id: int = None) -> None:
+        """Сбрасывает весь кэш, кэш одной таблицы или записи с заданным id."""
+        with self._lock:
+            if model is None:
+                self._caches.clear()
+            elif dimension_id is None:
+                self._caches.pop(model.__tablename__, None)
+            else:
+                cache = self._cache(model)
+                for name in [name for name, cached_id in cache.items() if cached_id == dimension_id]:
+                    del cache[name]
+        self.stats["invalidated"] += 1
+
+    def sizes(self) -> Dict[str, int]:
+        return {table: len(cache) for table, cache in self._caches.items()}
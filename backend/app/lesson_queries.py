@@ -0,0 +1,42 @@
+# backend/app/lesson_queries.py
+"""
+Запросы к урокам по основным путям доступа.
+
+Условия на даты - полуоткрытые диапазоны по start_time (start_time >= начало первого дня
+и < начала следующего за последним днем), а не func.date(start_time): функция над колонкой
+не дает БД использовать индекс. Каждому запросу соответствует индекс из db_models.Lesson,
+test_query_plans.py проверяет это через EXPLAIN QUERY PLAN.
+"""
+import datetime
+from typing import Tuple
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+from . import db_models as dbm
+
+
+def day_range(start_date: datetime.date, end_date: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """[начало start_date, начало дня после end_date) для условий по start_time."""
+    return (datetime.datetime.combine(start_date, datetime.time.min),
+            datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min))
+
+
+def group_lessons_in_range(group_id: int, start_date: datetime.date, end_date: datetime.date, *columns) -> Select:
+    """Уроки группы за даты [start_date, end_date] - индекс unique_lesson (group_id, start_time)."""
+    start, end = day_range(start_date, end_date)
+    return select(*(columns or (dbm.Lesson,))).where(
+        dbm.Lesson.group_id == group_id, dbm.Lesson.start_time >= start, dbm.Lesson.start_time < end
+    )
+
+
+def lessons_by_subject(subject_name: str) -> Select:
+    """Уроки предмета по времени - индекс ix_lessons_subject_start."""
+    return (select(dbm.Lesson).join(dbm.Subject).where(dbm.Subject.name == subject_name)
+            .order_by(dbm.Lesson.start_time))
+
+
+def classroom_schedule(classroom_name: str, date: datetime.date) -> Select:
+    """Занятия в аудитории за день - индекс ix_lessons_classroom_start."""
+    start, end = day_range(date, date)
+    return (select(dbm.Lesson).join(dbm.Classroom)
+            .where(dbm.Classroom.name == classroom_name, dbm.Lesson.start_time >= start, dbm.Lesson.start_time < end)
+            .order_by(dbm.Lesson.start_time))
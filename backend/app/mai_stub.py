@@ -0,0 +1,237 @@
+# backend/app/mai_stub.py
+"""
+Локальная замена сайта МАИ для офлайн-прогонов и нагрузочных тестов скрапера.
+
+Отдает страницы из архива фикстур (см. FIXTURE_RECORD_DIR), а для отсутствующих в архиве
+адресов - синтетические страницы расписания и выбора группы в разметке сайта.
+Задержка ответа и доля ошибок настраиваются; генератор случайных чисел с фиксированным seed,
+поэтому прогоны повторяемы. Поддерживает keep-alive и ETag / If-None-Match (304).
+
+Запуск: python -m app.mai_stub --port 8081 --fixtures fixtures --latency 0.05 --error-rate 0.02
+Скрапер направляется на заглушку через MAI_BASE_URL=http://127.0.0.1:8081
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import random
+import urllib.parse
+from typing import Dict, Optional, Tuple
+from .parsers.fixture_archive import FixtureArchive
+from .parsers.schedule_parser import eng_months
+from .semester import week_start
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_PATH = '/education/studies/schedule/index.php'
+GROUPS_PATH = '/education/studies/schedule/groups.php'
+STATS_PATH = '/__stub/stats'
+
+_MONTHS = {number: name for name, number in eng_months.items()}
+_WEEKDAYS = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+_SLOTS = ['09:00 – 10:30', '10:45 – 12:15', '13:00 – 14:30', '14:45 – 16:15', '16:30 – 18:00']
+_LESSON_TYPES = ['ЛК', 'ПЗ', 'ЛР']
+_SUBJECTS = ['Математический анализ', 'Линейная алгебра', 'Физика', 'Программирование',
+             'Иностранный язык', 'История', 'Теоретическая механика', 'Инженерная графика']
+_TEACHERS = ['Иванов Иван Иванович', 'Петров Петр Петрович', 'Сидорова Анна Сергеевна', 'Кузнецов К.К.']
+_REASONS = {200: 'OK', 304: 'Not Modified', 404: 'Not Found', 429: 'Too Many Requests',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def synthetic_schedule_page(group_number: str, week_number: int) -> str:
+    """Страница расписания группы на неделю; содержимое детерминировано по (группа, неделя)."""
+    rng = random.Random(f'{group_number}/{week_number}')
+    out = [
+        '<html><head><title>Расписание</title></head><body><div class="container">',
+        f'<h1 class="mb-2" itemprop="headline">\n\t{group_number}\n</h1>',
+        '<ul class="step mb-5">',
+    ]
+    monday = week_start(week_number)
+    for weekday in range(6):
+        slots = sorted(rng.sample(range(len(_SLOTS)), rng.randint(0, 4)))
+        if not slots:
+            continue
+        day = monday + datetime.timedelta(days=weekday)
+        out.append(
+            '<li class="step-item"><div class="step-content"><div class="d-flex mb-4">'
+            f'<span class="step-title ms-3 ms-sm-0 mt-2 mb-4 fw-bold">'
+            f'{_WEEKDAYS[weekday]},&nbsp;{day.day}&nbsp;{_MONTHS[day.month]}</span></div>'
+        )
+        for slot in slots:
+            teacher = rng.choice(_TEACHERS)
+            out.append(
+                '<div class="mb-4"><div class="d-sm-flex align-items-center">'
+                f'<p class="mb-2 fw-semi-bold text-dark">{rng.choice(_SUBJECTS)} '
+                f'<span class="badge">{rng.choice(_LESSON_TYPES)}</span></p></div>'
+                '<ul class="list-inline text-info d-sm-flex flex-wrap">'
+                f'<li class="list-inline-item">{_SLOTS[slot]}</li>'
+                f'<li class="list-inline-item"><a class="text-body" href="#">{teacher}</a></li>'
+                f'<li class="list-inline-item"><i class="fas"></i>ГУК Б-{rng.randint(100, 600)}</li>'
+                '</ul></div>'
+            )
+        out.append('</div></li>')
+    out.append('</ul></div></body></html>')
+    return '\n'.join(out)
+
+
+def synthetic_group_names(department: int, course: int, groups_per_course: int) -> list:
+    return [f'М{department}О-{course}{index:02d}Б-24' for index in range(1, groups_per_course + 1)]
+
+
+def synthetic_groups_page(departments: int, groups_per_course: int,
+                          department: Optional[str] = None, course: Optional[int] = None) -> str:
+    """Страница выбора группы: без параметров - список институтов, иначе ссылки на группы."""
+    if department is None:
+        options = ''.join(f'<option value="Институт №{number}">Институт №{number}</option>'
+                          for number in range(1, departments + 1))
+        return (f'<html><body><select class="form-select" id="department">'
+                f'<option value="">Выберите институт</option>{options}</select></body></html>')
+    number = int(department.rsplit('№', 1)[-1]) if '№' in department else 0
+    if not 1 <= number <= departments:
+        return '<html><body></body></html>'
+    links = ''.join(
+        f'<a class="btn btn-soft-secondary" href="index.php?group={urllib.parse.quote(name)}">{name}</a>'
+        for name in synthetic_group_names(number, course, groups_per_course)
+    )
+    return f'<html><body><div class="tab-content">{links}</div></body></html>'
+
+
+class MaiStub:
+    """HTTP-сервер, имитирующий страницы расписания МАИ."""
+
+    def __init__(self, fixtures: Optional[str] = None, synthetic: bool = True,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, departments: int = 3, groups_per_course: int = 2, seed: int = 0):
+        self.archive = FixtureArchive(fixtures) if fixtures else None
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.departments = departments
+        self.groups_per_course = groups_per_course
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.stats = {"requests": 0, "fixtures": 0, "synthetic": 0, "not_modified": 0,
+                      "errors_injected": 0, "not_found": 0}
+
+    def _page(self, target: str) -> Optional[str]:
+        if self.archive:
+            body = self.archive.load(target)
+            if body is not None:
+                self.stats["fixtures"] += 1
+                return body
+        if not self.synthetic:
+            return None
+        parts = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        if parts.path == SCHEDULE_PATH and 'group' in query:
+            self.stats["synthetic"] += 1
+            return synthetic_schedule_page(query['group'], int(query.get('week', 1)))
+        if parts.path == GROUPS_PATH:
+            self.stats["synthetic"] += 1
+            if 'department' in query:
+                return synthetic_groups_page(self.departments, self.groups_per_course,
+                                             query['department'], int(query.get('course', 1)))
+            return synthetic_groups_page(self.departments, self.groups_per_course)
+        return None
+
+    def respond(self, target: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Ответ на GET target: (код, заголовки, тело)."""
+        self.stats["requests"] += 1
+        if target == STATS_PATH:
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.stats).encode('utf-8')
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.stats["errors_injected"] += 1
+            return self.error_status, {}, b''
+        body = self._page(target)
+        if body is None:
+            self.stats["not_found"] += 1
+            return 404, {}, b''
+        data = body.encode('utf-8')
+        etag = '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+        if headers.get('if-none-match') == etag:
+            self.stats["not_modified"] += 1
+            return 304, {"ETag": etag}, b''
+        return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, data
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                _, target, _ = request_line.split(' ', 2)
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+                if delay:
+                    await asyncio.sleep(delay)
+                code, response_headers, body = self.respond(target, headers)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response_headers["Content-Length"] = str(len(body))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                writer.write(
+                    f'HTTP/1.1 {code} {_REASONS.get(code, "Unknown")}\r\n'.encode('ascii')
+                    + ''.join(f'{name}: {value}\r\n' for name, value in response_headers.items()).encode('latin-1')
+                    + b'\r\n' + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "MaiStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """Значение для MAI_BASE_URL."""
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}'
+
+
+async def _main(args: argparse.Namespace) -> None:
+    stub = MaiStub(fixtures=args.fixtures, synthetic=not args.no_synthetic, latency=args.latency,
+                   jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status,
+                   departments=args.departments, groups_per_course=args.groups_per_course, seed=args.seed)
+    await stub.start(args.host, args.port)
+    logger.info(f"Заглушка сайта МАИ запущена: MAI_BASE_URL={stub.base_url}")
+    await stub._server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Локальная заглушка сайта расписания МАИ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixtures", help="каталог архива фикстур (FIXTURE_RECORD_DIR)")
+    parser.add_argument("--no-synthetic", action="store_true", help="404 для адресов, которых нет в архиве")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до N с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов с ошибкой")
+    parser.add_argument("--error-status", type=int, default=503, help="код ответа для ошибок")
+    parser.add_argument("--departments", type=int, default=3, help="число синтетических институтов")
+    parser.add_argument("--groups-per-course", type=int, default=2, help="синтетических групп на курс")
+    parser.add_argument("--seed", type=int, default=0, help="seed для задержек и ошибок")
+    asyncio.run(_main(parser.parse_args()))
@@ -1,14 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import engine
+from .database import engine, warm_dimension_cache
+from .db_runtime import dispose_engines
 from .db_models import Base
 from .api import schedule, users  # Импортируем роутеры
+from .parsers.parse_pool import shutdown_parse_pool
+from .parsers.schedule_downloader import open_shared_client, close_shared_client
+from .refresh_scheduler import start_scheduler, stop_scheduler
+from .crawl_jobs import cancel_running_jobs
+from . import config
 
 Base.metadata.create_all(bind=engine)  # Создаем таблицы в БД, если их нет
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_dimension_cache()  # name -> id справочников одним запросом на таблицу
+    await open_shared_client()  # Один httpx-клиент (пул соединений, HTTP/2) на все задачи обхода
+    if config.SCHEDULER_ENABLED:
+        start_scheduler()  # Обновление расписания по REFRESH_* (обходит один экземпляр из всех)
+    yield
+    await stop_scheduler()
+    await cancel_running_jobs()  # Задачи force_parse используют общий клиент и БД, закрываемые ниже
+    await close_shared_client()
+    await dispose_engines()  # Закрываем пулы primary и реплик (aiosqlite/asyncpg - до остановки event loop)
+    shutdown_parse_pool()  # Останавливаем процессы парсинга
+
 app = FastAPI(
     title="Schedule Parser API",
     description="API for managing and retrieving schedule data.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(schedule.router)  # Подключаем роутер расписания
@@ -0,0 +1,136 @@
+# backend/app/parsers/adaptive_limiter.py
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+logger = logging.getLogger(__name__)
+
+
+class _Sample:
+    """Результат одного запроса внутри AdaptiveLimiter.slot()."""
+
+    __slots__ = ('ok',)
+
+    def __init__(self) -> None:
+        self.ok = True
+
+    def failed(self) -> None:
+        """Отметить запрос как ошибку сервера (5xx, 429)."""
+        self.ok = False
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class AdaptiveLimiter:
+    """
+    AIMD-регулятор числа одновременных запросов к сайту.
+
+    Каждые window запросов считаются p90 задержки и доля ошибок: если оба в норме,
+    лимит растет на 1 (additive increase), если p90 выше target_p90 или ошибок больше
+    max_error_rate - лимит умножается на backoff (multiplicative decrease). Ошибка сервера
+    или таймаут уменьшают лимит сразу, но не чаще одного раза за окно.
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, initial_limit: int,
+                 target_p90: float, max_error_rate: float, window: int, backoff: float = 0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.target_p90 = target_p90
+        self.max_error_rate = max_error_rate
+        self.window = max(1, window)
+        self.backoff = backoff
+
+        self._inflight = 0
+        self._condition = asyncio.Condition()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._cooldown = 0  # Сколько еще запросов не реагировать на ошибки после снижения
+
+        self.stats = {
+            "limit": self.limit,
+            "inflight": 0,
+            "requests": 0,
+            "errors": 0,
+            "increases": 0,
+            "decreases": 0,
+            "last_p90": None,
+            "last_error_rate": None,
+            "last_decision": None,
+        }
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[_Sample]:
+        """Ждет свободного места в пределах текущего лимита и замеряет запрос."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._inflight < self.limit)
+            self._inflight += 1
+            self.stats["inflight"] = self._inflight
+
+        sample = _Sample()
+        started = time.monotonic()
+        try:
+            yield sample
+        except BaseException:
+            sample.ok = False  # Таймауты и сетевые ошибки - признак перегрузки
+            raise
+        finally:
+            latency = time.monotonic() - started
+            async with self._condition:
+                self._inflight -= 1
+                self.stats["inflight"] = self._inflight
+                self._record(latency, sample.ok)
+                self._condition.notify_all()
+
+    def _set_limit(self, limit: int, decision: str, reason: str) -> None:
+        old_limit = self.limit
+        self.limit = min(self.max_limit, max(self.min_limit, limit))
+        self.stats["limit"] = self.limit
+        self.stats["last_decision"] = decision
+        if self.limit != old_limit:
+            self.stats["increases" if decision == "increase" else "decreases"] += 1
+            logger.info(f"Адаптивный лимит {old_limit} -> {self.limit} ({decision}: {reason})")
+
+    def _decrease(self, reason: str) -> None:
+        self._set_limit(math.floor(self.limit * self.backoff), "decrease", reason)
+        self._cooldown = self.window
+        self._latencies.clear()
+        self._errors = 0
+
+    def _record(self, latency: float, ok: bool) -> None:
+        self.stats["requests"] += 1
+        self._latencies.append(latency)
+        if self._cooldown:
+            self._cooldown -= 1
+        if not ok:
+            self.stats["errors"] += 1
+            self._errors += 1
+            if not self._cooldown:
+                self._decrease("ошибка сервера или таймаут")
+                return
+
+        if len(self._latencies) < self.window:
+            return
+
+        p90 = _percentile(self._latencies, 0.9)
+        error_rate = self._errors / len(self._latencies)
+        self.stats["last_p90"] = round(p90, 3)
+        self.stats["last_error_rate"] = round(error_rate, 3)
+        self._latencies.clear()
+        self._errors = 0
+
+        if error_rate > self.max_error_rate:
+            self._decrease(f"доля ошибок {error_rate:.0%}")
+        elif p90 > self.target_p90:
+            self._decrease(f"p90 {p90:.2f}s > {self.target_p90:.2f}s")
+        elif self._inflight + 1 >= self.limit:
+            # Увеличиваем только если лимит действительно упирается в нагрузку
+            self._set_limit(self.limit + 1, "increase", f"p90 {p90:.2f}s, ошибок {error_rate:.0%}")
+        else:
+            self.stats["last_decision"] = "hold"
@@ -0,0 +1,109 @@
+# backend/app/parsers/disk_cache.py
+import gzip
+import json
+import logging
+import os
+import time
+import urllib.parse
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCacheEntry(NamedTuple):
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float  # Время загрузки или последней успешной ревалидации (304)
+
+
+class DiskCache:
+    """
+    Кэш страниц на диске, переживающий перезапуск (в т.ч. uvicorn --reload).
+
+    На ключ приходится два файла: <key>.html.gz со сжатым телом ответа и <key>.json
+    с валидаторами (ETag, Last-Modified) для условных запросов. Вытеснение - по возрасту
+    записи и по суммарному размеру каталога (сначала самые старые).
+    """
+
+    EVICT_EVERY = 100  # Проверять лимиты раз в N записей
+
+    def __init__(self, directory: str, max_bytes: int, max_age: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0}
+        self._writes_since_evict = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, urllib.parse.quote(key, safe='') + suffix)
+
+    def get(self, key: str) -> Optional[DiskCacheEntry]:
+        try:
+            with open(self._path(key, '.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(self._path(key, '.html.gz'), 'rt', encoding='utf-8') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta["stored_at"] > self.max_age:
+            return None
+        return DiskCacheEntry(body, meta.get("etag"), meta.get("last_modified"), meta["stored_at"])
+
+    def _write_meta(self, key: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        tmp_path = self._path(key, '.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"etag": etag, "last_modified": last_modified, "stored_at": time.time()}, f)
+        os.replace(tmp_path, self._path(key, '.json'))
+
+    def put(self, key: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        try:
+            tmp_path = self._path(key, '.html.gz.tmp')
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                f.write(body)
+            os.replace(tmp_path, self._path(key, '.html.gz'))
+            self._write_meta(key, etag, last_modified)
+        except OSError as e:
+            logger.error(f"Не удалось записать кэш на диск для {key}: {e}")
+            return
+
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= self.EVICT_EVERY:
+            self.evict()
+
+    def touch(self, key: str, entry: DiskCacheEntry) -> None:
+        """Отмечает успешную ревалидацию (ответ 304): тело не меняется, обновляется время."""
+        try:
+            self._write_meta(key, entry.etag, entry.last_modified)
+        except OSError as e:
+            logger.error(f"Не удалось обновить кэш на диске для {key}: {e}")
+
+    def evict(self) -> None:
+        """Удаляет записи старше max_age, затем самые старые, пока кэш больше max_bytes."""
+        self._writes_since_evict = 0
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            key_path = os.path.join(self.directory, name[:-len('.json')])
+            try:
+                mtime = os.path.getmtime(key_path + '.json')
+                size = os.path.getsize(key_path + '.json') + os.path.getsize(key_path + '.html.gz')
+            except OSError:
+                continue
+            entries.append((mtime, size, key_path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, key_path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            for suffix in ('.json', '.html.gz'):
+                try:
+                    os.remove(key_path + suffix)
+                except OSError:
+                    pass
+            total -= size
+            self.stats["evicted"] += 1
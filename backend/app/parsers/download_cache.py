@@ -0,0 +1,286 @@
+# backend/app/parsers/download_cache.py
+import abc
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+import cachetools
+from .schedule_fragment import extract_schedule_fragment
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, без него доступен только zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[], Awaitable[Optional[str]]]
+Stored = Union[str, bytes]
+
+# Сжатое значение начинается с байта-метки алгоритма, поэтому записи с разными
+# настройками сжатия (например, от воркеров с разным конфигом) читаются одинаково.
+_ZLIB_TAG = b'z'
+_ZSTD_TAG = b's'
+
+
+class PageCodec:
+    """
+    Формат хранения страницы в кэше загрузок.
+
+    fragment_only - хранить только заголовок и блок расписания (extract_schedule_fragment),
+    parse_schedule разбирает их так же, как всю страницу. compression - none, zlib или zstd.
+    """
+
+    def __init__(self, fragment_only: bool = False, compression: str = "none"):
+        if compression not in ("none", "zlib", "zstd"):
+            raise ValueError(f"Неизвестный DOWNLOAD_CACHE_COMPRESSION: {compression!r} (ожидается none, zlib или zstd)")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("Пакет zstandard не установлен, кэш загрузок сжимается zlib")
+            compression = "zlib"
+        self.fragment_only = fragment_only
+        self.compression = compression
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if compression == "zstd" else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def encode(self, html: str) -> Tuple[Stored, str]:
+        """Возвращает (значение для кэша, страница для вызывающего кода)."""
+        if self.fragment_only:
+            html = extract_schedule_fragment(html) or html  # Страницу без расписания храним целиком
+        if self.compression == "zlib":
+            return _ZLIB_TAG + zlib.compress(html.encode('utf-8')), html
+        if self.compression == "zstd":
+            return _ZSTD_TAG + self._zstd_compressor.compress(html.encode('utf-8')), html
+        return html, html
+
+    def decode(self, stored: Stored) -> str:
+        if isinstance(stored, str):
+            return stored
+        tag, data = stored[:1], stored[1:]
+        if tag == _ZLIB_TAG:
+            return zlib.decompress(data).decode('utf-8')
+        if tag == _ZSTD_TAG and self._zstd_decompressor is not None:
+            return self._zstd_decompressor.decompress(data).decode('utf-8')
+        raise ValueError(f"Неизвестный формат записи кэша загрузок: {tag!r}")
+
+
+def _stored_size(value: Stored) -> int:
+    return len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+
+
+class DownloadCache(abc.ABC):
+    """
+    Интерфейс кэша загруженных страниц (ключ "<группа>-<неделя>" -> HTML).
+
+    Наследники реализуют хранилище (_load/_store/clear), формат записи задает PageCodec.
+    get_or_fetch() - single-flight: одновременные запросы одного ключа в процессе
+    ждут одну загрузку, а не идут на сайт каждый сам.
+    """
+
+    def __init__(self, codec: Optional[PageCodec] = None) -> None:
+        self.codec = codec or PageCodec()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0,
+                      "bytes_original": 0, "bytes_stored": 0, "bytes_saved": 0}
+
+    @abc.abstractmethod
+    def _load(self, key: str) -> Optional[Stored]:
+        """Сохраненное значение ключа или None."""
+
+    @abc.abstractmethod
+    def _store(self, key: str, value: Stored) -> None:
+        """Сохраняет значение (уже закодированное PageCodec)."""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Удаляет все записи."""
+
+    def get(self, key: str) -> Optional[str]:
+        stored = self._load(key)
+        return self.codec.decode(stored) if stored is not None else None
+
+    def set(self, key: str, value: str) -> str:
+        """Кладет страницу в кэш; возвращает то, что будет отдаваться из кэша (фрагмент или страница)."""
+        original_size = len(value.encode('utf-8'))
+        stored, value = self.codec.encode(value)
+        self._store(key, stored)
+        self.stats["bytes_original"] += original_size
+        self.stats["bytes_stored"] += _stored_size(stored)
+        self.stats["bytes_saved"] = self.stats["bytes_original"] - self.stats["bytes_stored"]
+        return value
+
+    async def _aget(self, key: str) -> Optional[str]:
+        return self.get(key)
+
+    async def _fetch(self, key: str, fetch: Fetch) -> Optional[str]:
+        """Загрузка лидером single-flight; успешный результат сразу кладется в кэш."""
+        value = await fetch()
+        return self.set(key, value) if value is not None else None
+
+    async def get_or_fetch(self, key: str, fetch: Fetch) -> Optional[str]:
+        value = await self._aget(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            logger.info(f"Загрузка из кэша: {key}")
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        self.stats["misses"] += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await self._fetch(key, fetch)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Ошибка уже передана лидеру, ожидающих может не быть
+            raise
+        finally:
+            del self._inflight[key]
+
+
+class MemoryDownloadCache(DownloadCache):
+    """Кэш в памяти процесса (cachetools.TTLCache) - поведение по умолчанию."""
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int = 0, codec: Optional[PageCodec] = None):
+        super().__init__(codec)
+        if max_bytes > 0:
+            # Лимит по памяти: сжатые фрагменты занимают в разы меньше, и страниц помещается больше
+            self._cache = cachetools.TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=sys.getsizeof)
+        else:
+            self._cache = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _load(self, key: str) -> Optional[Stored]:
+        return self._cache.get(key)
+
+    def _store(self, key: str, value: Stored) -> None:
+        try:
+            self._cache[key] = value
+        except ValueError:  # Значение больше всего лимита max_bytes
+            logger.warning(f"Страница {key} не помещается в кэш загрузок")
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class SqliteDownloadCache(DownloadCache):
+    """
+    Общий для всех воркеров на хосте кэш в файле SQLite (WAL).
+
+    Single-flight между процессами: перед загрузкой воркер берет аренду ключа в таблице
+    download_leases. Остальные воркеры, увидев чужую аренду, ждут появления страницы
+    в кэше; если аренда истекла (воркер упал или завис), ключ загружает следующий.
+    """
+
+    EVICT_EVERY = 100  # Удалять устаревшие записи раз в N записей
+    POLL_INTERVAL = 0.05  # Как часто проверять кэш, ожидая чужую загрузку, с
+
+    def __init__(self, path: str, maxsize: int, ttl: float, lease_timeout: float, codec: Optional[PageCodec] = None):
+        super().__init__(codec)
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.stats.update(waited=0, takeovers=0)
+        self._local = threading.local()
+        self._writes_since_evict = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS download_cache "
+                         "(key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_download_cache_stored_at ON download_cache (stored_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS download_leases "
+                         "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Соединение на поток: get/set вызываются из asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _load(self, key: str) -> Optional[Stored]:
+        row = self._connect().execute(
+            "SELECT value FROM download_cache WHERE key = ? AND stored_at > ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _store(self, key: str, value: Stored) -> None:
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO download_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                     (key, value, time.time()))
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= self.EVICT_EVERY:
+            self._writes_since_evict = 0
+            self.evict()
+
+    def evict(self) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM download_cache WHERE stored_at <= ?", (time.time() - self.ttl,))
+        conn.execute("DELETE FROM download_cache WHERE key NOT IN "
+                     "(SELECT key FROM download_cache ORDER BY stored_at DESC LIMIT ?)", (self.maxsize,))
+        conn.execute("DELETE FROM download_leases WHERE expires_at <= ?", (time.time(),))
+
+    def clear(self) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM download_cache")
+        conn.execute("DELETE FROM download_leases")
+
+    def try_lease(self, key: str) -> bool:
+        """Берет аренду ключа, если она свободна или истекла."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO download_leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE download_leases.expires_at <= ?",
+            (key, self.owner, now + self.lease_timeout, now),
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, key: str) -> None:
+        self._connect().execute("DELETE FROM download_leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    async def _aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def _fetch(self, key: str, fetch: Fetch) -> Optional[str]:
+        waited = False
+        while not await asyncio.to_thread(self.try_lease, key):
+            # Страницу загружает другой воркер - ждем, пока она появится в кэше
+            waited = True
+            await asyncio.sleep(self.POLL_INTERVAL)
+            value = await asyncio.to_thread(self.get, key)
+            if value is not None:
+                self.stats["waited"] += 1
+                logger.info(f"Страница загружена другим воркером: {key}")
+                return value
+        if waited:
+            # Аренда освободилась без результата: загрузка у другого воркера не удалась или он упал
+            self.stats["takeovers"] += 1
+        try:
+            value = await fetch()
+            return await asyncio.to_thread(self.set, key, value) if value is not None else None
+        finally:
+            await asyncio.to_thread(self.release_lease, key)
+
+def create_download_cache(backend: str, path: str, maxsize: int, ttl: float, lease_timeout: float,
+                          max_bytes: int = 0, codec: Optional[PageCodec] = None) -> DownloadCache:
+    if backend == "memory":
+        return MemoryDownloadCache(maxsize, ttl, max_bytes, codec)
+    if backend == "sqlite":
+        return SqliteDownloadCache(path, maxsize, ttl, lease_timeout, codec)
+    raise ValueError(f"Неизвестный DOWNLOAD_CACHE_BACKEND: {backend!r} (ожидается memory или sqlite)")
@@ -0,0 +1,53 @@
+# backend/app/parsers/fixture_archive.py
+import gzip
+import logging
+import os
+import urllib.parse
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureArchive:
+    """
+    Архив записанных ответов сайта для офлайн-прогонов (см. app.mai_stub).
+
+    Ключ - путь и query-строка запроса без хоста, поэтому записанные с mai.ru страницы
+    отдаются по тем же адресам с любого MAI_BASE_URL. На ключ - один файл <key>.html.gz.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url: str) -> str:
+        """'https://mai.ru/a/index.php?group=X' -> '/a/index.php?group=X' (query в каноничном виде)."""
+        parts = urllib.parse.urlsplit(url)
+        query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+        return f'{parts.path}?{query}' if query else parts.path
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, urllib.parse.quote(self.key(url), safe='') + '.html.gz')
+
+    def save(self, url: str, body: str) -> None:
+        path = self._path(url)
+        tmp_path = path + '.tmp'
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Не удалось записать фикстуру {self.key(url)}: {e}")
+
+    def load(self, url: str) -> Optional[str]:
+        try:
+            with gzip.open(self._path(url), 'rt', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def keys(self) -> Iterator[str]:
+        for name in os.listdir(self.directory):
+            if name.endswith('.html.gz'):
+                yield urllib.parse.unquote(name[:-len('.html.gz')])
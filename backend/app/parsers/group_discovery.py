@@ -0,0 +1,75 @@
+# backend/app/parsers/group_discovery.py
+import html
+import logging
+import re
+import urllib.parse
+from typing import List, Optional
+import httpx
+from .. import config
+from . import schedule_downloader
+
+logger = logging.getLogger(__name__)
+
+COURSES = range(1, 7)
+
+_DEPARTMENT_SELECT_RE = re.compile(r'<select[^>]*\bid\s*=\s*["\']department["\'][^>]*>(.*?)</select>', re.S | re.I)
+_OPTION_RE = re.compile(r'<option[^>]*\bvalue\s*=\s*["\']([^"\']+)["\']', re.I)
+_GROUP_LINK_RE = re.compile(r'href\s*=\s*["\'][^"\']*index\.php\?group=([^"\'&]+)', re.I)
+
+
+def groups_url(department: Optional[str] = None, course: Optional[int] = None) -> str:
+    url = f'{config.MAI_BASE_URL}/education/studies/schedule/groups.php'
+    if department is None:
+        return url
+    return f'{url}?department={urllib.parse.quote(department)}&course={course}'
+
+
+async def _get_page(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    try:
+        await schedule_downloader.rate_limiter.acquire(url)
+        r = await client.get(url, headers={"User-Agent": config.USER_AGENT})
+        r.raise_for_status()
+        if schedule_downloader.fixture_recorder:
+            schedule_downloader.fixture_recorder.save(url, r.text)
+        return r.text
+    except httpx.HTTPError as e:
+        logger.error(f"Ошибка при загрузке списка групп {url}: {e}")
+        return None
+
+
+def parse_departments(page: str) -> List[str]:
+    """Институты из выпадающего списка на странице выбора группы."""
+    select = _DEPARTMENT_SELECT_RE.search(page)
+    if select is None:
+        return []
+    return [html.unescape(value) for value in _OPTION_RE.findall(select.group(1))]
+
+
+def parse_group_links(page: str) -> List[str]:
+    """Номера групп из ссылок вида index.php?group=..."""
+    return [urllib.parse.unquote(html.unescape(value)).strip() for value in _GROUP_LINK_RE.findall(page)]
+
+
+async def discover_groups(client: httpx.AsyncClient) -> List[str]:
+    """
+    Обходит страницы выбора группы (институт x курс) и возвращает все найденные группы.
+
+    Returns:
+        Отсортированный список номеров групп без повторов (пустой, если индекс недоступен).
+    """
+    index_page = await _get_page(client, groups_url())
+    if index_page is None:
+        return []
+    departments = parse_departments(index_page)
+    if not departments:
+        logger.warning("На странице выбора группы не найден список институтов")
+        return []
+
+    groups = set()
+    for department in departments:
+        for course in COURSES:
+            page = await _get_page(client, groups_url(department, course))
+            if page:
+                groups.update(parse_group_links(page))
+        logger.info(f"Поиск групп: {department} - найдено всего {len(groups)}")
+    return sorted(groups)
@@ -0,0 +1,116 @@
+# backend/app/parsers/lesson_batch.py
+import datetime
+import sys
+from array import array
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+EPOCH = datetime.datetime(1970, 1, 1)  # naive, как и время уроков на сайте
+
+
+class LessonRow(NamedTuple):
+    """Один урок из LessonBatch. Поля совпадают с ParsedLesson."""
+    subject: str
+    teacher: str
+    classroom: str
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    lesson_type: str
+    group: str
+
+
+def to_seconds(value: datetime.datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def from_seconds(value: int) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(seconds=value)
+
+
+class LessonBatch:
+    """
+    Колоночный набор уроков.
+
+    Строковые поля хранятся как индексы в общем словаре строк батча (группа, предмет,
+    преподаватель и аудитория повторяются от урока к уроку), время начала и конца -
+    как секунды от EPOCH в array('q'). Батч сериализуется (pickle) без служебного индекса
+    строк, поэтому дешево передается между процессами.
+    """
+
+    __slots__ = ('strings', '_string_ids', 'subject', 'teacher', 'classroom',
+                 'lesson_type', 'group', 'start', 'end')
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self._string_ids: dict = {}
+        self.subject = array('I')
+        self.teacher = array('I')
+        self.classroom = array('I')
+        self.lesson_type = array('I')
+        self.group = array('I')
+        self.start = array('q')
+        self.end = array('q')
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(sys.intern(value))
+            self._string_ids[value] = string_id
+        return string_id
+
+    def append(self, subject: str, teacher: str, classroom: str,
+               start_time: datetime.datetime, end_time: datetime.datetime,
+               lesson_type: str, group: str) -> None:
+        self.subject.append(self._intern(subject))
+        self.teacher.append(self._intern(teacher))
+        self.classroom.append(self._intern(classroom))
+        self.lesson_type.append(self._intern(lesson_type))
+        self.group.append(self._intern(group))
+        self.start.append(to_seconds(start_time))
+        self.end.append(to_seconds(end_time))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> "LessonBatch":
+        batch = cls()
+        for row in rows:
+            batch.append(*row)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __bool__(self) -> bool:
+        return len(self.start) > 0
+
+    def __getitem__(self, index: int) -> LessonRow:
+        strings = self.strings
+        return LessonRow(
+            strings[self.subject[index]],
+            strings[self.teacher[index]],
+            strings[self.classroom[index]],
+            from_seconds(self.start[index]),
+            from_seconds(self.end[index]),
+            strings[self.lesson_type[index]],
+            strings[self.group[index]],
+        )
+
+    def __iter__(self) -> Iterator[LessonRow]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"<LessonBatch(lessons={len(self)}, strings={len(self.strings)})>"
+
+    def __getstate__(self):
+        return (self.strings, self.subject, self.teacher, self.classroom,
+                self.lesson_type, self.group, self.start, self.end)
+
+    def __setstate__(self, state) -> None:
+        (self.strings, self.subject, self.teacher, self.classroom,
+         self.lesson_type, self.group, self.start, self.end) = state
+        self.strings = [sys.intern(value) for value in self.strings]
+        self._string_ids = {value: string_id for string_id, value in enumerate(self.strings)}
+
+    def names(self, column: str) -> set:
+        """Различные значения строковой колонки ('subject', 'teacher', 'classroom', 'group', ...)."""
+        return {self.strings[string_id] for string_id in set(getattr(self, column))}
@@ -0,0 +1,68 @@
+# backend/app/parsers/parse_pool.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional
+from .. import config
+from .lesson_batch import LessonBatch
+from .schedule_parser import parse_schedule, parse_schedule_iter
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _parse_batch(html_content: str, backend: str) -> LessonBatch:
+    """Выполняется в процессе пула: HTML на входе, колоночный LessonBatch на выходе."""
+    return parse_schedule(html_content, backend)
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    """
+    Возвращает общий пул процессов парсинга, создавая его при первом обращении.
+
+    Процессы запускаются через spawn: пул создается, когда в процессе уже работают потоки
+    (asyncio.to_thread, aiosqlite), а fork процесса с потоками может оставить в дочернем
+    захваченные блокировки.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=config.PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Запущен пул парсинга на {config.PARSE_WORKERS} процессов")
+    return _executor
+
+
+def shutdown_parse_pool() -> None:
+    """Останавливает пул процессов парсинга (вызывается при остановке приложения)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        logger.info("Пул парсинга остановлен")
+
+
+async def parse_schedule_async(html_content: str) -> Iterable[LessonBatch]:
+    """
+    Разбирает страницу, не блокируя event loop.
+
+    При config.PARSE_WORKERS > 0 разбор выполняется в ProcessPoolExecutor: в пул передается
+    только строка HTML, обратно приходит один LessonBatch (массивы + словарь строк).
+    При PARSE_WORKERS = 0 страница разбирается в текущем процессе потоково, по дням.
+    """
+    if config.PARSE_WORKERS <= 0:
+        return parse_schedule_iter(html_content)
+
+    global _executor
+    loop = asyncio.get_running_loop()
+    executor = get_parse_executor()
+    try:
+        batch = await loop.run_in_executor(executor, _parse_batch, html_content, config.PARSER_BACKEND)
+    except BrokenProcessPool as e:
+        logger.error(f"Пул парсинга упал, пересоздаем и разбираем страницу в потоке: {e}")
+        if _executor is executor:  # Пул мог уже пересоздать другой разбор, упавший вместе с этим
+            _executor = None
+            executor.shutdown(wait=False, cancel_futures=True)  # Освобождаем поток управления и процессы упавшего пула
+        batch = await asyncio.to_thread(_parse_batch, html_content, config.PARSER_BACKEND)
+    return [batch]
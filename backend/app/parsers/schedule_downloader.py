@@ -1,9 +1,24 @@
+import codecs
+import contextlib
 import urllib.parse
 import httpx
 import os
-import cachetools
+import time
+import asyncio
 import logging
+from typing import AsyncIterator, Optional
 from .. import config
+from .disk_cache import DiskCache
+from .download_cache import PageCodec, create_download_cache
+from .fixture_archive import FixtureArchive
+from .schedule_fragment import ScheduleFragmentScanner
+from .rate_limiter import HostRateLimiter
+from .adaptive_limiter import AdaptiveLimiter
+
+try:
+    import h2  # noqa: F401  # httpx[http2]
+except ImportError:  # без h2 клиент работает по HTTP/1.1
+    h2 = None
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +26,77 @@ CACHE_DIR = config.CACHE_DIR
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
-cache = cachetools.TTLCache(maxsize=config.CACHE_MAX_SIZE, ttl=config.CACHE_TTL)
+cache = create_download_cache(config.DOWNLOAD_CACHE_BACKEND, config.DOWNLOAD_CACHE_PATH,
+                              config.CACHE_MAX_SIZE, config.CACHE_TTL, config.DOWNLOAD_LEASE_TIMEOUT,
+                              max_bytes=config.DOWNLOAD_CACHE_MAX_BYTES,
+                              codec=PageCodec(config.DOWNLOAD_CACHE_FRAGMENT_ONLY, config.DOWNLOAD_CACHE_COMPRESSION))
+disk_cache = DiskCache(CACHE_DIR, config.DISK_CACHE_MAX_BYTES, config.DISK_CACHE_MAX_AGE) if config.DISK_CACHE_ENABLED else None
+# Режим записи: все загруженные страницы сохраняются в архив фикстур для app.mai_stub
+fixture_recorder = FixtureArchive(config.FIXTURE_RECORD_DIR) if config.FIXTURE_RECORD_DIR else None
+# Потоковая загрузка (STREAM_DOWNLOAD): сколько прочитано из сети и сколько оставлено после вырезания фрагмента
+stream_stats = {"pages": 0, "bytes_read": 0, "bytes_kept": 0, "closed_early": 0}
+rate_limiter = HostRateLimiter(config.CRAWL_RATE, config.CRAWL_BURST)
+# При выключенном ADAPTIVE_CONCURRENCY min = max, т.е. лимит фиксирован на CRAWL_CONCURRENCY
+adaptive_limiter = AdaptiveLimiter(
+    min_limit=config.ADAPTIVE_MIN_CONCURRENCY if config.ADAPTIVE_CONCURRENCY else config.CRAWL_CONCURRENCY,
+    max_limit=config.CRAWL_CONCURRENCY,
+    initial_limit=config.ADAPTIVE_INITIAL_CONCURRENCY,
+    target_p90=config.ADAPTIVE_TARGET_P90,
+    max_error_rate=config.ADAPTIVE_MAX_ERROR_RATE,
+    window=config.ADAPTIVE_WINDOW,
+)
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Создает httpx.AsyncClient с пулом соединений, рассчитанным на CRAWL_CONCURRENCY.
+
+    HTTP/2 (HTTP2) мультиплексирует все загрузки в одно TLS-соединение с хостом; ответы
+    сжаты gzip или brotli (httpx сам добавляет br в Accept-Encoding, если установлен brotli).
+    Простаивающие соединения живут HTTP_KEEPALIVE_EXPIRY секунд, поэтому между задачами
+    не нужно заново резолвить хост и устанавливать TLS.
+    """
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = config.HTTP2 and h2 is not None
+    if config.HTTP2 and not http2:
+        logger.warning("Пакет h2 не установлен, загрузки идут по HTTP/1.1")
+    return httpx.AsyncClient(timeout=config.HTTP_TIMEOUT, limits=limits, http2=http2)
+
+
+# Общий клиент приложения: открывается и закрывается в lifespan FastAPI (см. app.main)
+shared_client: Optional[httpx.AsyncClient] = None
+
+
+async def open_shared_client() -> httpx.AsyncClient:
+    global shared_client
+    if shared_client is None:
+        shared_client = create_client()
+    return shared_client
+
+
+async def close_shared_client() -> None:
+    global shared_client
+    if shared_client is not None:
+        await shared_client.aclose()
+        shared_client = None
+
+
+@contextlib.asynccontextmanager
+async def client_session() -> AsyncIterator[httpx.AsyncClient]:
+    """Общий клиент приложения, а вне приложения (CLI, скрипты) - временный клиент."""
+    if shared_client is not None:
+        yield shared_client
+        return
+    async with create_client() as client:
+        yield client
 
 
 def url_gen(group_number: str, week_number: int):
-    return f'https://mai.ru/education/studies/schedule/index.php?group={urllib.parse.quote(group_number)}&week={week_number}'
+    return f'{config.MAI_BASE_URL}/education/studies/schedule/index.php?group={urllib.parse.quote(group_number)}&week={week_number}'
 
 async def get_html(client: httpx.AsyncClient, group_number: str, week_number: int):
     """
@@ -29,22 +110,87 @@ async def get_html(client: httpx.AsyncClient, group_number: str, week_number: in
     Returns:
         HTML-контент страницы в виде строки или None в случае ошибки.
     """
-    url = url_gen(group_number, week_number)
     cache_key = f"{group_number}-{week_number}"  # Add week_number to cache key
+    try:
+        # Одновременные запросы одной страницы (в т.ч. из других воркеров при sqlite-кэше) ждут одну загрузку
+        url = url_gen(group_number, week_number)
+        return await cache.get_or_fetch(cache_key, lambda: _download_html(client, url, cache_key))
+    except Exception as e:
+        logger.error(f"Неизвестная ошибка при загрузке HTML: {e}")
+        return None
+
+
+async def _read_schedule_fragment(r: httpx.Response) -> str:
+    """
+    Читает ответ по кускам и сразу вырезает фрагмент расписания (ScheduleFragmentScanner),
+    не собирая всю страницу в одну строку. После закрытия блока расписания остаток
+    ответа не декодируется: до STREAM_DRAIN_BYTES дочитывается, чтобы соединение
+    вернулось в пул keep-alive, а более длинный хвост обрывается закрытием соединения.
+    """
+    scanner = ScheduleFragmentScanner()
+    decoder = codecs.getincrementaldecoder(r.encoding or 'utf-8')(errors='replace')
+    drained = 0
+    async for chunk in r.aiter_bytes():
+        stream_stats["bytes_read"] += len(chunk)
+        if scanner.done:
+            drained += len(chunk)
+            if drained > config.STREAM_DRAIN_BYTES:
+                stream_stats["closed_early"] += 1
+                break
+            continue
+        scanner.feed(decoder.decode(chunk))
+    if not scanner.done:
+        scanner.feed(decoder.decode(b'', final=True))
+    html = scanner.result()
+    stream_stats["pages"] += 1
+    stream_stats["bytes_kept"] += len(html)
+    return html
+
 
+async def _download_html(client: httpx.AsyncClient, url: str, cache_key: str):
+    """Загрузка страницы при промахе кэша загрузок: дисковый кэш, условный запрос, сайт."""
     try:
-        if cache_key in cache:
-            logger.info(f"Загрузка из кэша: {cache_key}")
-            return cache[cache_key]
+        entry = await asyncio.to_thread(disk_cache.get, cache_key) if disk_cache else None
+        if entry and time.time() - entry.stored_at < config.CACHE_TTL:
+            logger.info(f"Загрузка из дискового кэша: {cache_key}")
+            disk_cache.stats["hits"] += 1
+            return entry.body
 
         headers = {"User-Agent": config.USER_AGENT}  # Add User-Agent
-        r = await client.get(url, headers=headers)
-        r.raise_for_status()  # Check HTTP status code
+        if entry:
+            # Условный запрос: при 304 тело страницы не передается повторно
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        await rate_limiter.acquire(url)
+        async with adaptive_limiter.slot() as sample:
+            async with client.stream("GET", url, headers=headers) as r:
+                if r.status_code >= 500 or r.status_code == 429:
+                    sample.failed()
+                # Для записи фикстур нужна вся страница, поэтому при записи потоковый режим выключен
+                if r.status_code == 200 and config.STREAM_DOWNLOAD and not fixture_recorder:
+                    html = await _read_schedule_fragment(r)
+                else:
+                    await r.aread()
+                    html = r.text
 
-        html = r.text
+        if r.status_code == 304 and entry:
+            logger.info(f"Страница не изменилась (304): {cache_key}")
+            disk_cache.stats["revalidated"] += 1
+            await asyncio.to_thread(disk_cache.touch, cache_key, entry)
+            if fixture_recorder:
+                await asyncio.to_thread(fixture_recorder.save, url, entry.body)
+            return entry.body
+
+        r.raise_for_status()  # Check HTTP status code
 
         logger.info(f"Загрузка с сайта: {cache_key}")
-        cache[cache_key] = html
+        if disk_cache:
+            disk_cache.stats["misses"] += 1
+            await asyncio.to_thread(disk_cache.put, cache_key, html, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        if fixture_recorder:
+            await asyncio.to_thread(fixture_recorder.save, url, html)
         return html
     except httpx.RequestError as e:  # Catch specific exceptions
         logger.error(f"Ошибка при запросе к {url}: {e}")
@@ -52,6 +198,3 @@ async def get_html(client: httpx.AsyncClient, group_number: str, week_number: in
     except httpx.HTTPStatusError as e:
         logger.error(f"Ошибка HTTP {e.response.status_code} при запросе к {url}")
         return None
-    except Exception as e:
-        logger.error(f"Неизвестная ошибка при загрузке HTML: {e}")
-        return None
\ No newline at end of file
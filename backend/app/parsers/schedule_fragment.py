@@ -0,0 +1,120 @@
+# backend/app/parsers/schedule_fragment.py
+import hashlib
+import re
+from typing import Optional
+
+# Парсер читает со страницы только заголовок с группой (itemprop="headline")
+# и блок расписания (class="step mb-5"); все остальное - оформление сайта.
+_HEADLINE_RE = re.compile(r'<([a-zA-Z][\w-]*)[^>]*\bitemprop\s*=\s*["\']headline["\'][^>]*>')
+_STEP_BLOCK_RE = re.compile(r'<([a-zA-Z][\w-]*)[^>]*\bclass\s*=\s*["\']step mb-5["\'][^>]*>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _element_end(html: str, start: re.Match) -> Optional[int]:
+    """Позиция сразу за закрывающим тегом элемента, открытого в start (с учетом вложенности)."""
+    tag_re = re.compile(rf'<(/?){re.escape(start.group(1))}\b[^>]*>', re.IGNORECASE)
+    depth = 1
+    for match in tag_re.finditer(html, start.end()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return None
+
+
+def _element(html: str, pattern: re.Pattern) -> Optional[str]:
+    start = pattern.search(html)
+    if start is None:
+        return None
+    end = _element_end(html, start)
+    return html[start.start():end] if end is not None else None
+
+
+def extract_schedule_fragment(html_content: str) -> Optional[str]:
+    """
+    Вырезает из страницы заголовок с группой и блок расписания.
+
+    Returns:
+        Минимальный HTML, который parse_schedule разбирает так же, как всю страницу,
+        или None, если нужные элементы не найдены.
+    """
+    headline = _element(html_content, _HEADLINE_RE)
+    step_block = _element(html_content, _STEP_BLOCK_RE)
+    if headline is None or step_block is None:
+        return None
+    return f"{headline}\n{step_block}"
+
+
+def fragment_digest(html_content: str) -> Optional[str]:
+    """Дайджест нормализованного (без различий в пробелах) фрагмента расписания страницы."""
+    fragment = extract_schedule_fragment(html_content)
+    if fragment is None:
+        return None
+    normalized = _WHITESPACE_RE.sub(' ', fragment).strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ScheduleFragmentScanner:
+    """
+    Потоковый вариант extract_schedule_fragment: страница подается кусками (feed),
+    в памяти держится только заголовок и еще не разобранный хвост.
+
+    Пока заголовок не найден, текст копится целиком: если на странице нет расписания,
+    result() вернет ее как есть (parse_schedule сообщит, чего не хватает). После
+    закрытия блока расписания done = True и остаток ответа можно не читать.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._headline: Optional[str] = None
+        self._step_parts: list = []
+        self._step_tag_re: Optional[re.Pattern] = None
+        self._depth = 0
+        self.done = False
+
+    def feed(self, text: str) -> bool:
+        """Добавляет кусок страницы; возвращает True, когда фрагмент собран."""
+        if self.done:
+            return True
+        self._buffer += text
+        if self._headline is None:
+            start = _HEADLINE_RE.search(self._buffer)
+            end = _element_end(self._buffer, start) if start else None
+            if end is None:
+                return False
+            self._headline = self._buffer[start.start():end]
+            self._buffer = self._buffer[end:]
+        if self._step_tag_re is None:
+            start = _STEP_BLOCK_RE.search(self._buffer)
+            if start is None:
+                # Открывающий тег может быть разрезан между кусками - оставляем хвост с последнего '<'
+                self._buffer = self._buffer[max(self._buffer.rfind('<'), 0):]
+                return False
+            self._step_tag_re = re.compile(rf'<(/?){re.escape(start.group(1))}\b[^>]*>', re.IGNORECASE)
+            self._depth = 1
+            self._step_parts.append(self._buffer[start.start():start.end()])
+            self._buffer = self._buffer[start.end():]
+        return self._scan_step_block()
+
+    def _scan_step_block(self) -> bool:
+        position = 0
+        for match in self._step_tag_re.finditer(self._buffer):
+            self._depth += -1 if match.group(1) else 1
+            position = match.end()
+            if self._depth == 0:
+                self._step_parts.append(self._buffer[:position])
+                self._buffer = ''
+                self.done = True
+                return True
+        # Разобранное уходит в результат, недочитанный тег (после последнего '<') остается в буфере
+        cut = max(position, self._buffer.rfind('<')) if '<' in self._buffer[position:] else len(self._buffer)
+        self._step_parts.append(self._buffer[:cut])
+        self._buffer = self._buffer[cut:]
+        return False
+
+    def result(self) -> str:
+        if self._headline is None:
+            return self._buffer
+        if not self.done:
+            # Страница закончилась без (закрытого) блока расписания - отдаем один заголовок
+            return self._headline
+        return f"{self._headline}\n{''.join(self._step_parts)}"
@@ -1,14 +1,19 @@
 # backend/app/parsers/schedule_parser.py
 from bs4 import BeautifulSoup
 from datetime import datetime
+from collections import Counter
 import re
 import logging
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Iterable, Iterator, Tuple
+from .. import config
+from .lesson_batch import LessonBatch, LessonRow
 
 logger = logging.getLogger(__name__)
 
 # Define Pydantic model for lesson data
+# Используется только в строгом режиме (config.PARSER_STRICT):
+# основной результат парсера - колоночный LessonBatch.
 class ParsedLesson(BaseModel):
     subject: str
     teacher: str
@@ -19,58 +24,178 @@ class ParsedLesson(BaseModel):
     group: str
 
 
-def parse_schedule(html_content: str) -> List[ParsedLesson]:
-    """
-    Parses HTML schedule content and returns a list of ParsedLesson objects.
-    """
+eng_months = {
+    'января': 1,
+    'февраля': 2,
+    'марта': 3,
+    'апреля': 4,
+    'мая': 5,
+    'ибня': 6,
+    'июля': 7,
+    'августа': 8,
+    'сентября': 9,
+    'октября': 10,
+    'ноября': 11,
+    'декабря': 12
+}
+
+
+# Бэкенды разбора HTML.
+# Каждый бэкенд оборачивает дерево документа и отдает только то, что нужно парсеру:
+# заголовок с группой, дни (step-item), дату дня, блоки уроков и их содержимое.
+# Отсутствующий элемент -> None (как find() в BeautifulSoup), ошибка структуры урока -> AttributeError.
+
+class _Bs4Document:
+    """Pure-Python backend: BeautifulSoup + html.parser (поведение по умолчанию)."""
+
+    def __init__(self, html_content: str):
+        self.soup = BeautifulSoup(html_content, 'html.parser')
+
+    def headline(self) -> Optional[str]:
+        element = self.soup.find(itemprop='headline')
+        return element.text if element is not None else None
+
+    def days(self) -> Optional[list]:
+        block = self.soup.find(class_='step mb-5')
+        return block.find_all(class_='step-item') if block is not None else None
+
+    def day_date(self, day) -> Optional[str]:
+        content = day.find(class_="step-content")
+        span = content.find('span') if content is not None else None
+        return span.text if span is not None else None
+
+    def day_lessons(self, day) -> list:
+        return day.select("div[class='mb-4']")
+
+    def lesson_parts(self, lesson) -> Tuple[str, List[str]]:
+        title = lesson.find('div').text
+        content = [x.text for x in lesson.find('ul').find_all('li')]
+        return title, content
+
+
+class _LxmlDocument:
+    """C-backed backend: lxml.html + XPath."""
+
+    _step_item = ".//*[contains(concat(' ', normalize-space(@class), ' '), ' step-item ')]"
+    _step_content = ".//*[contains(concat(' ', normalize-space(@class), ' '), ' step-content ')]"
+
+    def __init__(self, html_content: str):
+        import lxml.html
+        parser = lxml.html.HTMLParser(encoding='utf-8')
+        self.root = lxml.html.document_fromstring(html_content.encode('utf-8'), parser=parser)
+
+    @staticmethod
+    def _first(element, path):
+        found = element.xpath(path)
+        return found[0] if found else None
+
+    def headline(self) -> Optional[str]:
+        element = self._first(self.root, "//*[@itemprop='headline']")
+        return str(element.text_content()) if element is not None else None
+
+    def days(self) -> Optional[list]:
+        block = self._first(self.root, "//*[@class='step mb-5']")
+        return block.xpath(self._step_item) if block is not None else None
+
+    def day_date(self, day) -> Optional[str]:
+        content = self._first(day, self._step_content)
+        span = self._first(content, ".//span") if content is not None else None
+        return str(span.text_content()) if span is not None else None
+
+    def day_lessons(self, day) -> list:
+        return day.xpath(".//div[@class='mb-4']")
+
+    def lesson_parts(self, lesson) -> Tuple[str, List[str]]:
+        title = self._first(lesson, ".//div")
+        ul = self._first(lesson, ".//ul")
+        if title is None or ul is None:
+            raise AttributeError("lesson block without title <div> or <ul>")
+        return str(title.text_content()), [str(x.text_content()) for x in ul.xpath(".//li")]
+
+
+class _SelectolaxDocument:
+    """C-backed backend: selectolax (lexbor) + CSS-селекторы."""
+
+    def __init__(self, html_content: str):
+        from selectolax.lexbor import LexborHTMLParser
+        self.tree = LexborHTMLParser(html_content)
+
+    def headline(self) -> Optional[str]:
+        element = self.tree.css_first('[itemprop="headline"]')
+        return element.text() if element is not None else None
+
+    def days(self) -> Optional[list]:
+        block = self.tree.css_first('[class="step mb-5"]')
+        return self._descendants(block, '.step-item') if block is not None else None
+
+    @staticmethod
+    def _descendants(node, selector: str) -> list:
+        # В отличие от BeautifulSoup, css() у selectolax проверяет и сам узел
+        return [x for x in node.css(selector) if x.mem_id != node.mem_id]
+
+    def _first(self, node, selector: str):
+        found = self._descendants(node, selector)
+        return found[0] if found else None
+
+    def day_date(self, day) -> Optional[str]:
+        content = self._first(day, '.step-content')
+        span = self._first(content, 'span') if content is not None else None
+        return span.text() if span is not None else None
+
+    def day_lessons(self, day) -> list:
+        return self._descendants(day, 'div[class="mb-4"]')
+
+    def lesson_parts(self, lesson) -> Tuple[str, List[str]]:
+        title = self._first(lesson, 'div')
+        ul = self._first(lesson, 'ul')
+        if title is None or ul is None:
+            raise AttributeError("lesson block without title <div> or <ul>")
+        return title.text(), [x.text() for x in self._descendants(ul, 'li')]
 
-    eng_months = {
-        'января': 1,
-        'февраля': 2,
-        'марта': 3,
-        'апреля': 4,
-        'мая': 5,
-        'ибня': 6,
-        'июля': 7,
-        'августа': 8,
-        'сентября': 9,
-        'октября': 10,
-        'ноября': 11,
-        'декабря': 12
-    }
-
-    soup = BeautifulSoup(html_content, 'html.parser')
 
+PARSER_BACKENDS = {
+    'bs4': _Bs4Document,
+    'lxml': _LxmlDocument,
+    'selectolax': _SelectolaxDocument,
+}
+
+
+def _iter_days(html_content: str, backend: str, strict: bool) -> Iterator[List[LessonRow]]:
+    """Разбирает страницу и отдает уроки по дням (step-item) в виде списков LessonRow."""
     try:
-        group = soup.find(itemprop='headline').text
-        group = re.sub(r'[\n\t]', '', group)
-    except AttributeError as e:  # Specific exception
-        logger.error(f"Не удалось извлечь название группы: {e}")
-        return []
+        document_cls = PARSER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд парсера: {backend!r}. Доступные: {', '.join(PARSER_BACKENDS)}")
+
+    document = document_cls(html_content)
+
+    group = document.headline()
+    if group is None:
+        logger.error("Не удалось извлечь название группы: элемент headline не найден")
+        return
+    group = re.sub(r'[\n\t]', '', group)
 
-    days = soup.find(class_='step mb-5').find_all(class_='step-item')
+    days = document.days()
 
     if not days:
         logger.warning('[parser.py]Тег step mb-5 или step-item не найден')
-        return []
+        return
 
-    schedule: List[ParsedLesson] = []
     current_year = datetime.now().year  # Get current year
 
     for day in days:
-        date_element = day.find(class_="step-content").find('span')
-        if not date_element:
+        date_text = document.day_date(day)
+        if not date_text:
             logger.warning("Не найден элемент даты для дня")
             continue
 
-        date_text = date_element.text
         date_text = re.sub(r'[\n\t]', '', date_text)
         date_text = re.sub(r'[\xa0]', ' ', date_text)[4:].split()
 
-        for lesson in day.select("div[class='mb-4']"):
+        day_lessons: List[LessonRow] = []
+        for lesson in document.day_lessons(day):
             try:
-                lesson_title = lesson.find('div').text
-                lesson_content = [x.text for x in lesson.find('ul').find_all('li')]
+                lesson_title, lesson_content = document.lesson_parts(lesson)
                 lesson_content = [re.sub(r'[\n\t]', '', item) for item in lesson_content]
 
                 lesson_title = re.sub(r'[\n\t]', '', lesson_title)
@@ -90,18 +215,93 @@ def parse_schedule(html_content: str) -> List[ParsedLesson]:
                 lesson_teacher = ' | '.join(lesson_content[1:-1]) if len(lesson_content) > 2 else 'Преподаватель не указан'
                 lesson_classroom = lesson_content[-1]
 
-                parsed_lesson = ParsedLesson(
-                    subject=lesson_subject,
-                    teacher=lesson_teacher,
-                    classroom=lesson_classroom,
-                    start_time=lesson_start_time,
-                    end_time=lesson_end_time,
-                    lesson_type=lesson_type,
-                    group=group
-                )
-                schedule.append(parsed_lesson)
+                row = LessonRow(lesson_subject, lesson_teacher, lesson_classroom,
+                                lesson_start_time, lesson_end_time, lesson_type, group)
+                if strict:
+                    # pydantic.ValidationError - подкласс ValueError: урок будет пропущен
+                    row = LessonRow(**ParsedLesson(**row._asdict()).model_dump())
+                day_lessons.append(row)
             except (AttributeError, ValueError) as e:
                 logger.error(f"Ошибка при парсинге урока: {e}") # Log the exception
                 continue # skip the problematic lesson
 
-    return schedule
\ No newline at end of file
+        if day_lessons:
+            yield day_lessons
+
+
+def _parse_with_backend(html_content: str, backend: str, strict: Optional[bool] = None) -> LessonBatch:
+    if strict is None:
+        strict = config.PARSER_STRICT
+    batch = LessonBatch()
+    for day_lessons in _iter_days(html_content, backend, strict):
+        for row in day_lessons:
+            batch.append(*row)
+    return batch
+
+
+def compare_lessons(expected: Iterable[LessonRow], actual: Iterable[LessonRow]) -> List[str]:
+    """
+    Сравнивает два результата парсинга как мультимножества уроков.
+
+    Returns:
+        Список описаний расхождений (пустой, если результаты совпадают).
+    """
+    expected_counts = Counter(tuple(lesson) for lesson in expected)
+    actual_counts = Counter(tuple(lesson) for lesson in actual)
+    fields = LessonRow._fields
+
+    differences = []
+    for row, count in (expected_counts - actual_counts).items():
+        differences.append(f"только в эталоне (x{count}): {dict(zip(fields, row))}")
+    for row, count in (actual_counts - expected_counts).items():
+        differences.append(f"только в проверяемом (x{count}): {dict(zip(fields, row))}")
+    return differences
+
+
+def check_parity(html_content: str, backend: str, reference: str = 'bs4') -> List[str]:
+    """
+    Разбирает одну и ту же страницу двумя бэкендами и возвращает расхождения.
+    """
+    return compare_lessons(
+        _parse_with_backend(html_content, reference),
+        _parse_with_backend(html_content, backend),
+    )
+
+
+def parse_schedule(html_content: str, backend: Optional[str] = None) -> LessonBatch:
+    """
+    Parses HTML schedule content and returns a LessonBatch with all lessons of the page.
+
+    При config.PARSER_STRICT каждый урок дополнительно проверяется моделью ParsedLesson,
+    невалидные уроки пропускаются.
+
+    Бэкенд выбирается аргументом или config.PARSER_BACKEND ('bs4', 'lxml', 'selectolax').
+    При config.PARSER_PARITY_CHECK страница дополнительно разбирается эталонным бэкендом
+    'bs4', а все различающиеся уроки пишутся в лог.
+    """
+    backend = backend or config.PARSER_BACKEND
+    schedule = _parse_with_backend(html_content, backend)
+
+    if config.PARSER_PARITY_CHECK and backend != 'bs4':
+        differences = compare_lessons(_parse_with_backend(html_content, 'bs4'), schedule)
+        if differences:
+            logger.warning(f"Расхождение бэкендов 'bs4' и '{backend}': {len(differences)} уроков")
+            for difference in differences:
+                logger.warning(f"  {difference}")
+        else:
+            logger.info(f"Бэкенды 'bs4' и '{backend}' совпали ({len(schedule)} уроков)")
+
+    return schedule
+
+
+def parse_schedule_iter(html_content: str, backend: Optional[str] = None) -> Iterator[LessonBatch]:
+    """
+    Потоковый вариант parse_schedule: отдает по одному LessonBatch на каждый разобранный
+    день (step-item), не собирая расписание недели целиком. Дни идут в порядке страницы.
+
+    Проверка паритета (config.PARSER_PARITY_CHECK) здесь не выполняется - она требует
+    полного результата, используйте parse_schedule или check_parity.
+    """
+    backend = backend or config.PARSER_BACKEND
+    for day_lessons in _iter_days(html_content, backend, config.PARSER_STRICT):
+        yield LessonBatch.from_rows(day_lessons)
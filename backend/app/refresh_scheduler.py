@@ -0,0 +1,128 @@
+# backend/app/refresh_scheduler.py
+"""
+Планировщик обновления расписания внутри приложения (включается SCHEDULER_ENABLED=True).
+
+Раз в SCHEDULER_TICK секунд (со случайным разбросом) проверяет crawl_frontier и, если есть
+страницы, которым пора обновиться, запускает обход университета (run_university_crawl).
+Как часто обновляется неделя, задают REFRESH_* в config: текущая и следующая - раз в час,
+ближайшие - раз в день, прошедшие - никогда.
+
+При нескольких экземплярах приложения (несколько воркеров uvicorn, несколько контейнеров)
+обход запускает только держатель аренды scheduler_leases в БД; аренда продлевается, пока
+экземпляр жив, и переходит к другому, если он упал.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Optional
+from . import config, database
+from .parsers.schedule_downloader import client_session
+from .university_crawl import run_university_crawl, count_due_pages, crawl_progress
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'refresh_scheduler'
+OWNER = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_task: Optional[asyncio.Task] = None
+_last_discover = None  # time.monotonic() последнего поиска групп
+
+# Состояние планировщика этого экземпляра
+scheduler_state = {
+    "enabled": False,
+    "owner": OWNER,
+    "leader": False,
+    "runs": 0,
+    "last_run_at": None,
+    "last_error": None,
+}
+
+
+def _jittered_tick() -> float:
+    return config.SCHEDULER_TICK * random.uniform(1 - config.REFRESH_JITTER, 1 + config.REFRESH_JITTER)
+
+
+def _discover_due() -> bool:
+    if config.SCHEDULER_DISCOVER_INTERVAL <= 0:
+        return False
+    return _last_discover is None or time.monotonic() - _last_discover >= config.SCHEDULER_DISCOVER_INTERVAL
+
+
+async def _renew_lease() -> None:
+    """Продлевает аренду, пока идет обход: он может длиться дольше SCHEDULER_LEASE_TTL."""
+    while True:
+        await asyncio.sleep(config.SCHEDULER_LEASE_TTL / 3)
+        held = await asyncio.to_thread(database.acquire_lease, LEASE_NAME, OWNER, config.SCHEDULER_LEASE_TTL)
+        if not held:
+            logger.warning("Планировщик потерял аренду во время обхода")
+        scheduler_state["leader"] = held
+
+
+async def run_due_refresh() -> bool:
+    """Один шаг планировщика. Возвращает True, если обход был запущен."""
+    global _last_discover
+    leader = await asyncio.to_thread(database.acquire_lease, LEASE_NAME, OWNER, config.SCHEDULER_LEASE_TTL)
+    scheduler_state["leader"] = leader
+    if not leader or crawl_progress["running"]:
+        return False
+    discover = _discover_due()
+    if not discover and not await asyncio.to_thread(count_due_pages):
+        return False
+
+    renewal = asyncio.create_task(_renew_lease())
+    try:
+        async with client_session() as client:
+            await run_university_crawl(client, discover=discover)
+    finally:
+        renewal.cancel()
+    if discover:
+        _last_discover = time.monotonic()
+    scheduler_state["runs"] += 1
+    scheduler_state["last_run_at"] = datetime.datetime.now().isoformat()
+    return True
+
+
+async def run_scheduler() -> None:
+    logger.info(f"Планировщик обновления расписания запущен ({OWNER})")
+    try:
+        while True:
+            try:
+                await run_due_refresh()
+                scheduler_state["last_error"] = None
+            except Exception as e:
+                scheduler_state["last_error"] = str(e)
+                logger.error(f"Ошибка планировщика обновления расписания: {e}")
+            await asyncio.sleep(_jittered_tick())
+    finally:
+        scheduler_state["leader"] = False
+        try:
+            database.release_lease(LEASE_NAME, OWNER)  # Другой экземпляр подхватит обход, не дожидаясь TTL
+        except Exception as e:
+            logger.error(f"Не удалось освободить аренду планировщика: {e}")
+
+
+def start_scheduler() -> None:
+    """Запускает планировщик в текущем event loop (из lifespan приложения)."""
+    global _task
+    if _task is None or _task.done():
+        scheduler_state["enabled"] = True
+        _task = asyncio.create_task(run_scheduler())
+
+
+async def stop_scheduler() -> None:
+    """Останавливает планировщик; незавершенный обход продолжится со следующего запуска."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    scheduler_state["enabled"] = False
@@ -2,67 +2,336 @@ import logging
 from sqlalchemy.orm import Session
 import asyncio
 import httpx
-import atexit
-from . import database
-from .parsers.schedule_parser import parse_schedule, ParsedLesson
+import datetime
+import inspect
+import time
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Sized, Tuple, Union
+from . import database, config
+from .database import dbm
+from .parsers.lesson_batch import LessonBatch, from_seconds
+from .parsers.parse_pool import parse_schedule_async
+from .parsers.schedule_fragment import fragment_digest
 from .parsers.schedule_downloader import url_gen, get_html
 
 logger = logging.getLogger(__name__)
 
-async def scrape_schedule_async(session: Session, client: httpx.AsyncClient, group_number: str, week_number: int) -> None:
-    """
-    Загружает, парсит и сохраняет расписание для заданной группы и недели.
-    """
-    html = await get_html(client, group_number, week_number)
-    if html:
-        schedule = parse_schedule(html)
-        if schedule:
-            schedule_upload(session, schedule)
+# Пропуски неизменившихся страниц (по дайджесту фрагмента расписания)
+page_digest_stats = {"hits": 0, "misses": 0}
+
+# Итог синхронизации уроков с БД (write_schedule)
+lesson_sync_stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+# Стадии конвейера обхода (scrape_and_update_all_schedules_async): глубина очередей и скорость
+pipeline_stats = {stage: {} for stage in ("download", "parse", "write")}
+
+# Результаты обработки страницы (передаются в on_page_done конвейера)
+PAGE_UPLOADED = "uploaded"    # Расписание сохранено
+PAGE_UNCHANGED = "unchanged"  # Страница не изменилась с прошлой загрузки
+PAGE_EMPTY = "empty"          # Страница загружена, но уроков на ней нет
+PAGE_FAILED = "failed"        # Страницу не удалось загрузить
+
+class _StageMeter:
+    """Счетчики одной стадии конвейера в pipeline_stats: воркеры, очередь, обработано и скорость."""
+
+    def __init__(self, name: str, workers: int, queue: Optional[asyncio.Queue] = None):
+        self.stats = pipeline_stats[name]
+        self.queue = queue
+        self.started = time.monotonic()
+        self.stats.update(workers=workers, busy=0, queue=0, queue_capacity=queue.maxsize if queue else 0,
+                          processed=0, per_second=0.0)
+
+    def begin(self) -> None:
+        self.stats["busy"] += 1
+        if self.queue is not None:
+            self.stats["queue"] = self.queue.qsize()
+
+    def end(self, processed: int = 1) -> None:
+        self.stats["busy"] -= 1
+        self.stats["processed"] += processed
+        elapsed = time.monotonic() - self.started
+        self.stats["per_second"] = round(self.stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+
+
+def _write_pages(db: Session, pages: list) -> List[Tuple[str, int, str]]:
+    """Записывает страницы (group, week, digest, batches) в транзакции db; batches = None - страница не изменилась."""
+    saved, checked, results = [], [], []
+    for group_number, week_number, digest, batches in pages:
+        if batches is None:
+            checked.append((group_number, week_number))
+            results.append((group_number, week_number, PAGE_UNCHANGED))
+        elif write_schedule(db, batches):
+            if digest:
+                saved.append((group_number, week_number, digest))
             logger.info(f"Успешно загружено расписание для группы {group_number}, неделя {week_number}")
+            results.append((group_number, week_number, PAGE_UPLOADED))
         else:
             logger.error(f"Не удалось распарсить расписание для группы {group_number}, неделя {week_number}")
-    else:
-        logger.error(f"Не удалось загрузить расписание для группы {group_number}, неделя {week_number}")
+            results.append((group_number, week_number, PAGE_EMPTY))
+    database.record_page_digests(db, saved, checked)
+    return results
 
-async def scrape_and_update_all_schedules_async(session: Session, client: httpx.AsyncClient, group_numbers: list[str], week_numbers: list[int]) -> None:
+
+def _flush_pages(pages: list) -> List[Tuple[str, int, str]]:
+    """Одна транзакция на пачку страниц; при ошибке пачка переписывается по одной странице."""
+    try:
+        with database.get_session() as db:
+            return _write_pages(db, pages)
+    except Exception as e:
+        if len(pages) == 1:
+            group_number, week_number = pages[0][:2]
+            logger.error(f"Ошибка записи расписания группы {group_number}, неделя {week_number}: {e}")
+            return [(group_number, week_number, PAGE_FAILED)]
+        logger.error(f"Ошибка записи пачки из {len(pages)} страниц, записываем по одной: {e}")
+        return [result for page in pages for result in _flush_pages([page])]
+
+
+async def scrape_and_update_all_schedules_async(client: httpx.AsyncClient,
+                                                group_numbers: Sequence[str] = (), week_numbers: Sequence[int] = (),
+                                                pages: Union[Iterable[Tuple[str, int]], AsyncIterable[Tuple[str, int]], None] = None,
+                                                on_page_done: Optional[Callable[[str, int, str], Optional[Awaitable[None]]]] = None) -> None:
     """
     Загружает, парсит и сохраняет расписание для всех указанных групп и недель.
+
+    Вместо декартова произведения group_numbers x week_numbers можно передать готовый
+    список, генератор или асинхронный генератор страниц pages (в нужном порядке; источнику, который
+    ходит в БД, лучше быть асинхронным и не блокировать loop). on_page_done(group, week, result)
+    вызывается после каждой страницы с результатом (PAGE_UPLOADED, PAGE_UNCHANGED, PAGE_EMPTY,
+    PAGE_FAILED); если он - корутина, конвейер ее дожидается.
+
+    Обход - конвейер из трех стадий, связанных ограниченными очередями (PIPELINE_QUEUE_SIZE):
+    CRAWL_CONCURRENCY загрузчиков -> разбор в пуле процессов -> один писатель в БД, который
+    коммитит пачку страниц каждые WRITE_BATCH_LESSONS уроков или WRITE_BATCH_MS мс.
+    Полная очередь притормаживает предыдущую стадию; глубина очередей и скорость стадий -
+    в pipeline_stats. Писатель работает в своих сессиях в отдельном потоке, чтобы запись
+    не останавливала загрузки.
     """
-    tasks = [scrape_schedule_async(session, client, g, w) for g in group_numbers for w in week_numbers]
-    await asyncio.gather(*tasks)
-
-def lesson_upload(session: Session, lesson: ParsedLesson) -> None:  # Use ParsedLesson
-    subject = database.add_subject(session, lesson.subject)
-    teacher = database.add_teacher(session, lesson.teacher)
-    classroom = database.add_classroom(session, lesson.classroom)
-    start_time = lesson.start_time
-    end_time = lesson.end_time
-    lesson_type = lesson.lesson_type
-    group = database.add_group(session, lesson.group)
+    if pages is None:
+        pages = [(g, w) for g in group_numbers for w in week_numbers]
+    if hasattr(pages, "__aiter__"):
+        work = pages.__aiter__()
+        work_lock = asyncio.Lock()  # Асинхронный генератор нельзя продвигать из нескольких загрузчиков сразу
+
+        async def next_page() -> Optional[Tuple[str, int]]:
+            async with work_lock:
+                return await anext(work, None)
+    else:
+        work = iter(pages)
+
+        async def next_page() -> Optional[Tuple[str, int]]:
+            return next(work, None)
+    parse_queue: asyncio.Queue = asyncio.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    downloaders = min(config.CRAWL_CONCURRENCY, len(pages)) if isinstance(pages, Sized) else config.CRAWL_CONCURRENCY
+    parsers = max(config.PARSE_WORKERS, 1)
+    download_meter = _StageMeter("download", downloaders)
+    parse_meter = _StageMeter("parse", parsers, parse_queue)
+    write_meter = _StageMeter("write", 1, write_queue)
+    pipeline_stats["write"]["commits"] = 0
+
+    async def report(group_number: str, week_number: int, result: str) -> None:
+        if on_page_done:
+            done = on_page_done(group_number, week_number, result)
+            if inspect.isawaitable(done):
+                await done
 
+    async def download_stage() -> None:
+        while (page := await next_page()) is not None:  # Общий источник: каждую страницу берет один загрузчик
+            group_number, week_number = page
+            download_meter.begin()
+            try:
+                html = await get_html(client, group_number, week_number)
+                if not html:
+                    logger.error(f"Не удалось загрузить расписание для группы {group_number}, неделя {week_number}")
+                    await report(group_number, week_number, PAGE_FAILED)
+                    continue
+                digest = fragment_digest(html)
+                # SELECT в потоке: синхронный запрос в event loop ждал бы блокировку записи (busy_timeout)
+                if digest and await asyncio.to_thread(database.get_page_digest, group_number, week_number) == digest:
+                    page_digest_stats["hits"] += 1
+                    logger.info(f"Расписание не изменилось, пропускаем: группа {group_number}, неделя {week_number}")
+                    await write_queue.put((group_number, week_number, digest, None))
+                    continue
+                page_digest_stats["misses"] += 1
+                await parse_queue.put((group_number, week_number, html, digest))
+            except Exception as e:
+                logger.error(f"Ошибка при обработке группы {group_number}, неделя {week_number}: {e}")
+                await report(group_number, week_number, PAGE_FAILED)
+            finally:
+                download_meter.end()
+
+    async def parse_stage() -> None:
+        while (item := await parse_queue.get()) is not None:
+            group_number, week_number, html, digest = item
+            parse_meter.begin()
+            try:
+                batches = list(await parse_schedule_async(html))
+            except Exception as e:
+                logger.error(f"Ошибка разбора расписания группы {group_number}, неделя {week_number}: {e}")
+                await report(group_number, week_number, PAGE_FAILED)
+                continue
+            finally:
+                parse_meter.end()
+            await write_queue.put((group_number, week_number, digest, batches))
+
+    async def write_stage() -> None:
+        loop = asyncio.get_running_loop()
+        buffer, lessons, deadline, finished = [], 0, 0.0, False
+        while not finished:
+            try:
+                item = await (asyncio.wait_for(write_queue.get(), max(deadline - loop.time(), 0))
+                              if buffer else write_queue.get())
+            except asyncio.TimeoutError:
+                item = False  # Истек WRITE_BATCH_MS: пишем то, что накопилось
+            if item is None:
+                finished = True
+            elif item is not False:
+                if not buffer:
+                    deadline = loop.time() + config.WRITE_BATCH_MS / 1000
+                buffer.append(item)
+                lessons += sum(len(batch) for batch in item[3] or ())
+            if buffer and (item is None or item is False or lessons >= config.WRITE_BATCH_LESSONS
+                           or loop.time() >= deadline):
+                write_meter.begin()
+                try:
+                    results = await asyncio.to_thread(_flush_pages, buffer)
+                finally:
+                    write_meter.end(len(buffer))
+                pipeline_stats["write"]["commits"] += 1
+                buffer, lessons = [], 0
+                for result in results:
+                    await report(*result)
+
+    async def feed_stages() -> None:
+        await asyncio.gather(*stage_tasks)
+        for _ in parse_tasks:
+            await parse_queue.put(None)  # Конец очереди для каждого разборщика
+        await asyncio.gather(*parse_tasks)
+        await write_queue.put(None)
+
+    stage_tasks = [asyncio.create_task(download_stage()) for _ in range(downloaders)]
+    parse_tasks = [asyncio.create_task(parse_stage()) for _ in range(parsers)]
+    write_task = asyncio.create_task(write_stage())
+    feed_task = asyncio.create_task(feed_stages())
     try:
-        database.add_lesson(session, subject, teacher, classroom, start_time, end_time, lesson_type, group)
-        session.commit()
-        logger.info(f"Урок '{subject.name}' добавлен.")
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Ошибка при добавлении урока: {e}")
+        # Писатель - вместе со стадиями: если он упал, загрузчики ждали бы места в write_queue вечно
+        await asyncio.gather(feed_task, write_task)
+    finally:
+        for task in stage_tasks + parse_tasks + [write_task, feed_task]:
+            task.cancel()
 
-def schedule_upload(session: Session, schedule: list[ParsedLesson]) -> None:
-    if not schedule:
-        logger.warning("Попытка загрузить пустое расписание.")
-        return
+# Справочники урока: колонка LessonBatch -> модель
+DIMENSIONS = (
+    ('subject', dbm.Subject),
+    ('teacher', dbm.Teacher),
+    ('classroom', dbm.Classroom),
+    ('group', dbm.Group),
+)
 
-    # 1. Получаем минимальную и максимальную даты из расписания
-    dates = set(lesson.start_time.date() for lesson in schedule)
-    start_date = min(dates)
-    end_date = max(dates)
 
-    group_number: str = schedule[0].group
+def _extend_coverage(db: Session, covered: Dict[int, Tuple[datetime.date, datetime.date]], existing: dict,
+                     group_id: int, first: datetime.date, last: datetime.date) -> None:
+    """Загружает в existing уроки группы на еще не покрытые даты и расширяет покрытый диапазон."""
+    ranges = []
+    if group_id not in covered:
+        ranges.append((first, last))
+        covered[group_id] = (first, last)
+    else:
+        covered_from, covered_to = covered[group_id]
+        if first < covered_from:
+            ranges.append((first, covered_from - datetime.timedelta(days=1)))
+        if last > covered_to:
+            ranges.append((covered_to + datetime.timedelta(days=1), last))
+        covered[group_id] = (min(first, covered_from), max(last, covered_to))
+    for range_from, range_to in ranges:
+        for row in database.load_group_lessons_in_range(db, group_id, range_from, range_to):
+            existing[(group_id, row.start_time)] = row
+
+
+def write_schedule(db: Session, schedule: Iterable[LessonBatch]) -> int:
+    """
+    Синхронизирует уроки из последовательности LessonBatch в транзакции db.
+
+    Для каждого батча имена справочников разрешаются несколькими IN (...) запросами
+    (недостающие добавляются пакетно). Покрытый страницей диапазон дат каждой группы
+    сравнивается с уроками в БД по ключу unique_lesson (group_id, start_time): вставляются
+    только новые уроки, обновляются измененные, удаляются исчезнувшие - каждое действие
+    одним executemany. Неизменившиеся уроки не трогаются и сохраняют свои id.
+    Повтор (группа, время начала) на странице пропускается, как и раньше.
 
-    # 2. Удаляем старые записи для группы и диапазона дат
-    group = database.add_group(session, group_number)
-    database.delete_lessons_by_group_and_date_range(session, group, start_date, end_date)
+    Returns:
+        Количество обработанных уроков.
+    """
+    covered: Dict[int, Tuple[datetime.date, datetime.date]] = {}
+    existing = {}  # (group_id, start_time) -> строка урока из БД в покрытом диапазоне
+    parsed = {}  # (group_id, start_time) -> поля урока со страницы
+    count = 0
 
-    for lesson in schedule:
-        lesson_upload(session, lesson)
\ No newline at end of file
+    for batch in schedule:
+        if not batch:
+            continue
+        # id справочников по индексу строки батча
+        ids = {}
+        for column, model in DIMENSIONS:
+            names = database.resolve_names(db, model, batch.names(column))
+            ids[column] = [names.get(value) for value in batch.strings]
+
+        group_dates: Dict[int, Tuple[int, int]] = {}
+        for index in range(len(batch)):
+            group_id = ids['group'][batch.group[index]]
+            start = batch.start[index]
+            first, last = group_dates.get(group_id, (start, start))
+            group_dates[group_id] = (min(first, start), max(last, start))
+        for group_id, (first, last) in group_dates.items():
+            _extend_coverage(db, covered, existing, group_id, from_seconds(first).date(), from_seconds(last).date())
+
+        for index in range(len(batch)):
+            count += 1
+            group_id = ids['group'][batch.group[index]]
+            key = (group_id, from_seconds(batch.start[index]))
+            if key in parsed:
+                logger.warning(f"Урок группы {batch.strings[batch.group[index]]} в {key[1]} уже есть, пропускаем")
+                continue
+            parsed[key] = {
+                "subject_id": ids['subject'][batch.subject[index]],
+                "teacher_id": ids['teacher'][batch.teacher[index]],
+                "classroom_id": ids['classroom'][batch.classroom[index]],
+                "end_time": from_seconds(batch.end[index]),
+                "lesson_type": batch.strings[batch.lesson_type[index]],
+            }
+
+    inserts, updates = [], []
+    for (group_id, start_time), fields in parsed.items():
+        row = existing.pop((group_id, start_time), None)
+        if row is None:
+            inserts.append({"group_id": group_id, "start_time": start_time, **fields})
+        elif any(getattr(row, field) != value for field, value in fields.items()):
+            updates.append({"id": row.id, **fields})
+    deletes = [row.id for row in existing.values()]  # Уроки, которых больше нет на странице
+
+    database.delete_lessons_by_ids(db, deletes)
+    database.bulk_update_lessons(db, updates)
+    database.bulk_insert_lessons(db, inserts)
+
+    lesson_sync_stats["inserted"] += len(inserts)
+    lesson_sync_stats["updated"] += len(updates)
+    lesson_sync_stats["deleted"] += len(deletes)
+    lesson_sync_stats["unchanged"] += len(parsed) - len(inserts) - len(updates)
+    if inserts or updates or deletes:
+        logger.info(f"Уроки: добавлено {len(inserts)}, изменено {len(updates)}, удалено {len(deletes)}")
+    return count
+
+
+def schedule_upload(session: Session, schedule: Iterable[LessonBatch]) -> int:
+    """
+    Сохраняет расписание из последовательности LessonBatch: одного батча на страницу
+    (parse_schedule), батчей по дням (parse_schedule_iter) или страниц нескольких групп.
+    Вся запись - одна транзакция (собственная сессия, как у функций database).
+
+    Returns:
+        Количество обработанных уроков.
+    """
+    with database.get_session() as db:
+        count = write_schedule(db, schedule)
+    if not count:
+        logger.warning("Попытка загрузить пустое расписание.")
+    return count
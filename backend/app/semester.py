@@ -0,0 +1,30 @@
+# backend/app/semester.py
+import datetime
+from typing import Optional
+from . import config
+
+
+def semester_start(today: datetime.date) -> datetime.date:
+    """Понедельник первой недели текущего семестра."""
+    if config.SEMESTER_START:
+        return datetime.date.fromisoformat(config.SEMESTER_START)
+    if today.month >= 9:
+        start = datetime.date(today.year, 9, 1)
+    elif today.month == 1:
+        start = datetime.date(today.year - 1, 9, 1)
+    else:
+        start = datetime.date(today.year, 2, 1)
+    return start - datetime.timedelta(days=start.weekday())
+
+
+def current_week_number(today: Optional[datetime.date] = None) -> int:
+    """Номер текущей учебной недели (1..SEMESTER_WEEKS), как в параметре week на сайте."""
+    today = today or datetime.date.today()
+    week = (today - semester_start(today)).days // 7 + 1
+    return min(max(week, 1), config.SEMESTER_WEEKS)
+
+
+def week_start(week_number: int, today: Optional[datetime.date] = None) -> datetime.date:
+    """Понедельник учебной недели week_number текущего семестра."""
+    today = today or datetime.date.today()
+    return semester_start(today) + datetime.timedelta(weeks=week_number - 1)
@@ -0,0 +1,334 @@
+# backend/app/university_crawl.py
+"""
+Обход расписания всего университета.
+
+Группы берутся со страниц выбора группы на сайте МАИ, все пары (группа, неделя)
+хранятся в таблице crawl_frontier. Порядок обхода - по приоритету (текущая и следующая
+недели первыми), дальние недели обновляются реже, прошедшие - не обновляются.
+Состояние каждой страницы сохраняется сразу, поэтому после падения обход продолжается
+с того же места.
+
+Запуск: python -m app.university_crawl [--no-discover]
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Callable, List, Optional, Sequence, Tuple
+import httpx
+from sqlalchemy import select, update, func
+from . import config, database
+from .database import dbm
+from .parsers.group_discovery import discover_groups
+from .semester import current_week_number
+from .parsers.schedule_downloader import create_client
+from .scraper import scrape_and_update_all_schedules_async, PAGE_FAILED
+
+logger = logging.getLogger(__name__)
+
+FAILURE_BACKOFF_MAX = 24 * 3600  # Максимальная пауза перед повтором неудачной страницы, с
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"  # Владелец аренды страниц по умолчанию
+
+_started_monotonic = 0.0
+
+# Прогресс текущего (или последнего) обхода
+crawl_progress = {
+    "running": False,
+    "started_at": None,
+    "groups_discovered": 0,
+    "pages_due": 0,
+    "pages_done": 0,
+    "pages_failed": 0,
+    "pages_per_second": 0.0,
+    "eta_seconds": None,
+}
+
+
+def page_priority(week_number: int, current_week: int) -> int:
+    """Текущая неделя - 0, следующая - 1, дальше по удаленности; прошедшие - в конце."""
+    distance = week_number - current_week
+    return distance if distance >= 0 else config.SEMESTER_WEEKS - distance
+
+
+def refresh_interval(week_number: int, current_week: int) -> Optional[datetime.timedelta]:
+    """Как часто обновлять неделю; None - прошедшая неделя, больше не обновляется."""
+    distance = week_number - current_week
+    if distance < 0:
+        return None
+    if distance <= 1:
+        return datetime.timedelta(seconds=config.REFRESH_CURRENT_WEEK)
+    if distance <= config.REFRESH_NEAR_DISTANCE:
+        return datetime.timedelta(seconds=config.REFRESH_NEAR_WEEKS)
+    return datetime.timedelta(seconds=config.REFRESH_FAR_WEEKS)
+
+
+def jittered(interval: datetime.timedelta) -> datetime.timedelta:
+    """Интервал +-REFRESH_JITTER: страницы, обновленные одним обходом, не становятся due одновременно."""
+    return interval * (1 + random.uniform(-config.REFRESH_JITTER, config.REFRESH_JITTER))
+
+
+def seed_frontier(group_names: Sequence[str], week_numbers: Optional[Sequence[int]] = None) -> int:
+    """Добавляет в crawl_frontier недостающие пары (группа, неделя). Возвращает число добавленных."""
+    week_numbers = week_numbers or range(1, config.SEMESTER_WEEKS + 1)
+    current_week = current_week_number()
+    now = datetime.datetime.now()
+    with database.get_session() as session:
+        existing = set(session.execute(
+            select(dbm.CrawlFrontier.group_name, dbm.CrawlFrontier.week_number)
+        ).all())
+        new_pages = [
+            dbm.CrawlFrontier(group_name=group_name, week_number=week_number,
+                              priority=page_priority(week_number, current_week),
+                              status='pending', next_due_at=now, attempts=0)
+            for group_name in group_names for week_number in week_numbers
+            if (group_name, week_number) not in existing
+        ]
+        session.add_all(new_pages)
+    logger.info(f"В очередь обхода добавлено {len(new_pages)} страниц")
+    return len(new_pages)
+
+
+def recover_frontier() -> int:
+    """
+    Возвращает в очередь страницы, оставшиеся in_progress после падения воркера.
+
+    Страницы с действующей арендой не трогаются: их обрабатывает живой воркер.
+    """
+    now = datetime.datetime.now()
+    with database.get_session() as session:
+        result = session.execute(
+            update(dbm.CrawlFrontier)
+            .where(dbm.CrawlFrontier.status == 'in_progress')
+            .where(dbm.CrawlFrontier.lease_expires_at.is_(None) | (dbm.CrawlFrontier.lease_expires_at <= now))
+            .values(status='pending', lease_owner=None, lease_expires_at=None)
+        )
+        if result.rowcount:
+            logger.info(f"Восстановлено {result.rowcount} незавершенных страниц")
+        return result.rowcount
+
+
+def refresh_priorities(current_week: int) -> None:
+    """Пересчитывает приоритеты: текущая неделя меняется каждую неделю."""
+    with database.get_session() as session:
+        for week_number in range(1, config.SEMESTER_WEEKS + 1):
+            session.execute(
+                update(dbm.CrawlFrontier)
+                .where(dbm.CrawlFrontier.week_number == week_number)
+                .values(priority=page_priority(week_number, current_week))
+            )
+
+
+def _due_filter(now: datetime.datetime):
+    """Страницы, которые пора обновить, и страницы с истекшей арендой (воркер упал или завис)."""
+    return (((dbm.CrawlFrontier.status == 'pending') & (dbm.CrawlFrontier.next_due_at <= now))
+            | ((dbm.CrawlFrontier.status == 'in_progress') & (dbm.CrawlFrontier.lease_expires_at <= now)))
+
+
+def count_due_pages() -> int:
+    with database.get_session() as session:
+        return session.execute(
+            select(func.count()).select_from(dbm.CrawlFrontier).where(_due_filter(datetime.datetime.now()))
+        ).scalar_one()
+
+
+def count_leased_pages() -> int:
+    """Страницы, которые сейчас обрабатывают воркеры (аренда еще действует)."""
+    with database.get_session() as session:
+        return session.execute(
+            select(func.count()).select_from(dbm.CrawlFrontier)
+            .where(dbm.CrawlFrontier.status == 'in_progress')
+            .where(dbm.CrawlFrontier.lease_expires_at > datetime.datetime.now())
+        ).scalar_one()
+
+
+def claim_due_pages(limit: int, owner: str = WORKER_ID,
+                    lease_ttl: Optional[float] = None) -> List[Tuple[int, str, int]]:
+    """
+    Берет в аренду до limit страниц, которые пора обновить, в порядке приоритета.
+
+    Аренда ставится условным UPDATE (строка еще due), поэтому при одновременном claim
+    из нескольких процессов каждую страницу получает только один воркер; возвращаются
+    только страницы, доставшиеся owner.
+    """
+    now = datetime.datetime.now()
+    lease_expires_at = now + datetime.timedelta(seconds=lease_ttl or config.CRAWL_LEASE_TTL)
+    with database.get_session() as session:
+        candidates = session.execute(
+            select(dbm.CrawlFrontier.id)
+            .where(_due_filter(now))
+            .order_by(dbm.CrawlFrontier.priority, dbm.CrawlFrontier.next_due_at)
+            .limit(limit)
+        ).scalars().all()
+        if not candidates:
+            return []
+        session.execute(
+            update(dbm.CrawlFrontier)
+            .where(dbm.CrawlFrontier.id.in_(candidates))
+            .where(_due_filter(now))
+            .values(status='in_progress', lease_owner=owner, lease_expires_at=lease_expires_at)
+        )
+        rows = session.execute(
+            select(dbm.CrawlFrontier.id, dbm.CrawlFrontier.group_name, dbm.CrawlFrontier.week_number)
+            .where(dbm.CrawlFrontier.id.in_(candidates))
+            .where(dbm.CrawlFrontier.lease_owner == owner)
+            .where(dbm.CrawlFrontier.lease_expires_at == lease_expires_at)
+            .order_by(dbm.CrawlFrontier.priority, dbm.CrawlFrontier.next_due_at)
+        ).all()
+        return [tuple(row) for row in rows]
+
+
+def renew_leases(owner: str = WORKER_ID, lease_ttl: Optional[float] = None) -> int:
+    """Heartbeat: продлевает аренду всех страниц, которые обрабатывает owner."""
+    lease_expires_at = datetime.datetime.now() + datetime.timedelta(seconds=lease_ttl or config.CRAWL_LEASE_TTL)
+    with database.get_session() as session:
+        return session.execute(
+            update(dbm.CrawlFrontier)
+            .where(dbm.CrawlFrontier.status == 'in_progress')
+            .where(dbm.CrawlFrontier.lease_owner == owner)
+            .values(lease_expires_at=lease_expires_at)
+        ).rowcount
+
+
+def complete_page(page_id: int, week_number: int, result: str, current_week: int, owner: str = WORKER_ID) -> None:
+    """Сохраняет результат обработки страницы и время следующего обновления, снимает аренду."""
+    now = datetime.datetime.now()
+    with database.get_session() as session:
+        page = session.get(dbm.CrawlFrontier, page_id)
+        if page is None:
+            return
+        if page.lease_owner not in (owner, None):
+            # Аренда истекла и страницу уже взял другой воркер - результат запишет он
+            logger.warning(f"Страница {page.group_name}, неделя {week_number} передана воркеру {page.lease_owner}")
+            return
+        page.status = 'pending'
+        page.lease_owner = None
+        page.lease_expires_at = None
+        if result == PAGE_FAILED:
+            page.attempts += 1
+            page.last_error = result
+            page.next_due_at = now + datetime.timedelta(seconds=min(60 * 2 ** page.attempts, FAILURE_BACKOFF_MAX))
+        else:
+            page.attempts = 0
+            page.last_error = None
+            page.last_crawled_at = now
+            interval = refresh_interval(week_number, current_week)
+            page.next_due_at = now + jittered(interval) if interval is not None else None
+
+
+def _report_progress(result: str) -> None:
+    crawl_progress["pages_done"] += 1
+    if result == PAGE_FAILED:
+        crawl_progress["pages_failed"] += 1
+    elapsed = time.monotonic() - _started_monotonic
+    rate = crawl_progress["pages_done"] / elapsed if elapsed > 0 else 0.0
+    remaining = max(crawl_progress["pages_due"] - crawl_progress["pages_done"], 0)
+    crawl_progress["pages_per_second"] = round(rate, 2)
+    crawl_progress["eta_seconds"] = round(remaining / rate) if rate > 0 else None
+    if crawl_progress["pages_done"] % 50 == 0:
+        logger.info(
+            f"Обход университета: {crawl_progress['pages_done']}/{crawl_progress['pages_due']} страниц, "
+            f"{rate:.2f} стр/с, осталось ~{crawl_progress['eta_seconds']} с"
+        )
+
+
+async def _heartbeat(owner: str) -> None:
+    while True:
+        await asyncio.sleep(config.CRAWL_HEARTBEAT)
+        try:
+            await asyncio.to_thread(renew_leases, owner)
+        except Exception as e:  # Следующий heartbeat попробует снова, пока аренда не истекла
+            logger.error(f"Не удалось продлить аренду страниц: {e}")
+
+
+async def crawl_claimed_pages(client: httpx.AsyncClient, current_week: int, owner: str = WORKER_ID,
+                              on_page_done: Optional[Callable[[str], None]] = None) -> None:
+    """
+    Берет страницы из crawl_frontier порциями по CRAWL_CLAIM_BATCH и прогоняет через конвейер
+    скрапера, пока в очереди есть страницы, которые пора обновить.
+
+    Очередь дозабирается по мере обхода, конвейер не останавливается между порциями.
+    Пока идет обход, аренда взятых страниц продлевается каждые CRAWL_HEARTBEAT секунд.
+    claim и запись результата идут в потоке: UPDATE ждет блокировку записи (до busy_timeout),
+    пока писатель конвейера коммитит уроки, и не должен останавливать event loop.
+    """
+    page_ids = {}
+
+    async def due_pages():
+        while True:
+            claimed = await asyncio.to_thread(claim_due_pages, config.CRAWL_CLAIM_BATCH, owner)
+            if not claimed:
+                return
+            for page_id, group_name, week_number in claimed:
+                page_ids[(group_name, week_number)] = page_id
+                yield group_name, week_number
+
+    async def page_done(group_name: str, week_number: int, result: str) -> None:
+        await asyncio.to_thread(complete_page, page_ids.pop((group_name, week_number)), week_number, result,
+                                current_week, owner)
+        if on_page_done:
+            on_page_done(result)
+
+    heartbeat = asyncio.create_task(_heartbeat(owner))
+    try:
+        await scrape_and_update_all_schedules_async(client, pages=due_pages(), on_page_done=page_done)
+    finally:
+        heartbeat.cancel()
+
+
+async def run_university_crawl(client: httpx.AsyncClient, discover: bool = True) -> dict:
+    """
+    Обходит все страницы из crawl_frontier, которые пора обновить.
+
+    Args:
+        client: httpx.AsyncClient session.
+        discover: Перед обходом найти группы на сайте и добавить новые в очередь.
+
+    Returns:
+        Итоговый прогресс обхода (crawl_progress).
+    """
+    global _started_monotonic
+    if crawl_progress["running"]:
+        logger.warning("Обход университета уже выполняется")
+        return crawl_progress
+
+    crawl_progress.update(running=True, started_at=datetime.datetime.now().isoformat(), groups_discovered=0,
+                          pages_due=0, pages_done=0, pages_failed=0, pages_per_second=0.0, eta_seconds=None)
+    _started_monotonic = time.monotonic()
+    try:
+        if discover:
+            groups = await discover_groups(client)
+            crawl_progress["groups_discovered"] = len(groups)
+            await asyncio.to_thread(seed_frontier, groups)
+
+        await asyncio.to_thread(recover_frontier)
+        current_week = current_week_number()
+        await asyncio.to_thread(refresh_priorities, current_week)
+        crawl_progress["pages_due"] = await asyncio.to_thread(count_due_pages)
+        _started_monotonic = time.monotonic()  # Скорость считаем по самому обходу, без поиска групп
+        logger.info(f"Обход университета: текущая неделя {current_week}, страниц к обновлению {crawl_progress['pages_due']}")
+
+        await crawl_claimed_pages(client, current_week, on_page_done=lambda result: _report_progress(result))
+        logger.info(f"Обход университета завершен: {crawl_progress['pages_done']} страниц, "
+                    f"ошибок {crawl_progress['pages_failed']}")
+    finally:
+        crawl_progress["running"] = False
+        crawl_progress["eta_seconds"] = None
+    return crawl_progress
+
+
+async def _main(discover: bool) -> None:
+    database.warm_dimension_cache()
+    async with create_client() as client:
+        await run_university_crawl(client, discover=discover)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обход расписания всех групп МАИ")
+    parser.add_argument("--no-discover", action="store_true", help="не искать новые группы, только обойти очередь")
+    args = parser.parse_args()
+    asyncio.run(_main(discover=not args.no_discover))
@@ -0,0 +1,154 @@
+# backend/benchmarks/bench_async_db.py
+"""
+Бенчмарк асинхронного доступа к БД: задержка быстрых запросов, пока тот же воркер
+обслуживает медленные.
+
+Одно приложение, один event loop (httpx.ASGITransport, без сети). Медленные клиенты без пауз
+запрашивают GET /schedule/ с сортировкой по end_time (колонка без индекса: SQLite сортирует
+все уроки) и большим skip, быстрые - GET /users/me (только проверка токена). Уроки - синтетические
+страницы, размноженные --copies раз со сдвигом дат, чтобы время запроса уходило на SQLite, а не на Python.
+
+Путь sync - прежние обработчики: синхронная сессия внутри async def, пока идет запрос, event loop
+стоит. Путь async - текущие обработчики на асинхронных сессиях db_runtime: запрос выполняется в потоке aiosqlite,
+loop обслуживает остальных. Сравнивается p50/p99 быстрых запросов.
+
+Запуск из backend/: python -m benchmarks.bench_async_db --groups 60 --weeks 8 --copies 30 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_async_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'app.db')}"
+os.environ["SCHEDULER_ENABLED"] = "False"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, HTTPException  # noqa: E402
+from jose import JWTError, jwt  # noqa: E402
+from typing import List  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+from app import auth, config, database, schemas, scraper  # noqa: E402
+from app.db_runtime import dispose_engines  # noqa: E402
+from app.database import dbm  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.bench_db_profile import percentile  # noqa: E402
+from benchmarks.bench_schedule_upload import make_pages  # noqa: E402
+
+legacy = APIRouter(prefix="/legacy")
+
+
+def legacy_current_user(token: str = Depends(auth.oauth2_scheme)):
+    """Прежний auth.get_current_user: синхронный поиск пользователя на каждом запросе."""
+    try:
+        username = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM]).get("sub")
+    except JWTError:
+        raise HTTPException(status_code=401)
+    with database.get_session() as session:
+        user = session.execute(select(dbm.User).where(dbm.User.username == username)).scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+@legacy.get("/users/me")
+async def legacy_users_me(current_user=Depends(legacy_current_user)):
+    return {"username": current_user.username}
+
+
+@legacy.get("/schedule/", response_model=List[schemas.Lesson])
+async def legacy_read_schedules(sort_by: str, sort_order: str = "asc", skip: int = 0, limit: int = 100,
+                                current_user=Depends(legacy_current_user)):
+    sort_column = getattr(dbm.Lesson, sort_by)
+    stmt = (select(dbm.Lesson).options(joinedload(dbm.Lesson.subject), joinedload(dbm.Lesson.teacher),
+                                       joinedload(dbm.Lesson.classroom), joinedload(dbm.Lesson.group))
+            .order_by(sort_column.desc() if sort_order == "desc" else sort_column).offset(skip).limit(limit))
+    with database.get_session() as session:  # Синхронный запрос в async def: event loop ждет SQLite
+        return session.execute(stmt).scalars().all()
+
+
+app.include_router(legacy)
+
+
+def seed(groups: int, weeks: int, copies: int) -> int:
+    for page in make_pages(groups, weeks):
+        with database.get_session() as session:
+            scraper.write_schedule(session, [page])
+    columns = "subject_id, teacher_id, classroom_id, start_time, end_time, lesson_type, group_id"
+    with database.engine.begin() as conn:
+        last_id = conn.execute(text("SELECT max(id) FROM lessons")).scalar_one()
+        for copy in range(1, copies):  # Сдвиг на copy * 1000 дней: (group_id, start_time) не пересекаются
+            shift = f"'+{copy * 1000} days'"
+            conn.execute(text(f"INSERT INTO lessons ({columns}) SELECT subject_id, teacher_id, classroom_id, "
+                              f"datetime(start_time, {shift}), datetime(end_time, {shift}), lesson_type, group_id "
+                              f"FROM lessons WHERE id <= :last_id"), {"last_id": last_id})
+        rows = conn.execute(text("SELECT count(*) FROM lessons")).scalar_one()
+    with database.get_session() as session:
+        session.add(dbm.User(username="bench", email="bench@example.com", hashed_password=auth.get_password_hash("bench"),
+                             is_active=True, is_admin=False))
+    return rows
+
+
+async def run_path(prefix: str, headers: dict, skip: int, slow: int, fast: int, seconds: float) -> dict:
+    deadline = time.perf_counter() + seconds
+    fast_latencies, slow_latencies = [], []
+
+    async def client_loop(client: httpx.AsyncClient, url: str, latencies: list) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await asyncio.gather(
+            *(client_loop(client, f"{prefix}/schedule/?sort_by=end_time&sort_order=desc&skip={skip}&limit=20", slow_latencies)
+              for _ in range(slow)),
+            *(client_loop(client, f"{prefix}/users/me", fast_latencies) for _ in range(fast)),
+        )
+    return {
+        "fast_per_second": len(fast_latencies) / seconds,
+        "slow_per_second": len(slow_latencies) / seconds,
+        "p50_ms": statistics.median(fast_latencies) * 1000,
+        "p99_ms": percentile(fast_latencies, 0.99) * 1000,
+        "max_ms": max(fast_latencies) * 1000,
+        "slow_p50_ms": statistics.median(slow_latencies) * 1000 if slow_latencies else float("nan"),
+    }
+
+
+async def run(args, rows: int) -> None:
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': 'bench'})}"}
+    print(f"{'путь':<8}{'быстрых/с':>11}{'медл./с':>9}{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}{'медл. p50, мс':>15}")
+    try:
+        for name, prefix in (("sync", "/legacy"), ("async", "")):
+            result = await run_path(prefix, headers, rows // 2, args.slow, args.fast, args.seconds)
+            print(f"{name:<8}{result['fast_per_second']:>11.0f}{result['slow_per_second']:>9.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}{result['slow_p50_ms']:>15.1f}")
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=60)
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--copies", type=int, default=30, help="во сколько раз размножить уроки")
+    parser.add_argument("--slow", type=int, default=2, help="клиентов с медленным запросом")
+    parser.add_argument("--fast", type=int, default=8, help="клиентов с быстрым запросом")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rows = seed(args.groups, args.weeks, args.copies)
+    print(f"{rows} уроков, медленных клиентов: {args.slow}, быстрых: {args.fast}, {args.seconds:.0f} с на путь")
+    asyncio.run(run(args, rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_db_profile.py
+"""
+Бенчмарк профилей БД (DB_PROFILE): задержка чтения расписания аудитории, пока идет
+интенсивная запись уроков.
+
+Для каждого профиля - своя временная SQLite-база. Писатель загружает синтетические страницы
+(scraper.write_schedule, коммит на страницу), читатели в отдельных потоках в это время без пауз
+выполняют lesson_queries.classroom_schedule. Потоки делят GIL: на машине с одним ядром при
+многих читателях задержку определяет переключение потоков, а не блокировки БД. В профиле default (rollback
+journal, synchronous=FULL) коммит писателя блокирует читателей; в performance (WAL) - нет.
+
+Запуск из backend/: python -m benchmarks.bench_db_profile --groups 60 --weeks 4 --readers 2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_db_profile_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'app.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app import database, lesson_queries, scraper  # noqa: E402
+from app.database import dbm  # noqa: E402
+from app.db_profile import PROFILES, create_profiled_engine  # noqa: E402
+from benchmarks.bench_schedule_upload import make_pages  # noqa: E402
+
+
+def percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def run_profile(profile: str, pages: list, readers: int) -> dict:
+    engine = create_profiled_engine(f"sqlite:///{os.path.join(_db_dir, profile + '.db')}", profile=profile)
+    dbm.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    database.dimension_cache.invalidate()  # id справочников из базы предыдущего профиля
+
+    # Аудитории и дни, которые будут появляться в базе по ходу записи
+    targets = sorted({(row.classroom, row.start_time.date()) for page in pages for batch in page for row in batch})
+    writing = threading.Event()
+    writing.set()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        local = []
+        while writing.is_set():
+            classroom, day = rng.choice(targets)
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(lesson_queries.classroom_schedule(classroom, day)).all()
+                local.append(time.perf_counter() - started)
+            except OperationalError:  # database is locked
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for page in pages:
+            with Session() as session:
+                rows += scraper.write_schedule(session, page)
+                session.commit()
+    finally:
+        write_seconds = time.perf_counter() - started
+        writing.clear()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "rows_per_second": rows / write_seconds,
+        "reads_per_second": len(latencies) / write_seconds,
+        "read_errors": errors[0],
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else float("nan"),
+        "max_ms": max(latencies) * 1000 if latencies else float("nan"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=60)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    pages = [[batch] for batch in make_pages(args.groups, args.weeks)]
+    print(f"{len(pages)} страниц, {sum(len(page[0]) for page in pages)} уроков, читателей: {args.readers}")
+    print(f"{'профиль':<14}{'запись, строк/с':>16}{'чтений/с':>10}{'ошибок':>8}"
+          f"{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for profile in PROFILES:
+        result = run_profile(profile, pages, args.readers)
+        print(f"{profile:<14}{result['rows_per_second']:>16.0f}{result['reads_per_second']:>10.0f}{result['read_errors']:>8}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
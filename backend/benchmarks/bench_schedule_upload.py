@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_schedule_upload.py
+"""
+Бенчмарк записи расписания в БД: построчная загрузка (как было до пакетной) против
+schedule_upload с IN (...) разрешением справочников и синхронизацией уроков по разнице.
+
+Страницы - синтетические (app.mai_stub), каждый путь пишет в свою временную SQLite-базу.
+Первый проход - пустая база (справочники добавляются), второй - повторная загрузка тех же страниц.
+
+Запуск из backend/: python -m benchmarks.bench_schedule_upload --groups 20 --weeks 4
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_upload_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging  # noqa: E402
+from app import database, scraper  # noqa: E402
+from app.database import dbm  # noqa: E402
+from app.mai_stub import synthetic_group_names, synthetic_schedule_page  # noqa: E402
+from app.parsers.lesson_batch import LessonBatch  # noqa: E402
+from app.parsers.schedule_parser import parse_schedule  # noqa: E402
+
+
+def legacy_schedule_upload(session, schedule) -> int:
+    """Прежний путь: add_* и add_lesson на каждый урок, удаление диапазона по одному уроку."""
+    group = None
+    covered_from = covered_to = None
+    count = 0
+    for lesson in (row for batch in schedule for row in batch):
+        lesson_date = lesson.start_time.date()
+        if group is None:
+            group = database.add_group(session, lesson.group)
+        if covered_from is None:
+            database.delete_lessons_by_group_and_date_range(session, group, lesson_date, lesson_date)
+            covered_from = covered_to = lesson_date
+        elif lesson_date > covered_to:
+            database.delete_lessons_by_group_and_date_range(session, group, covered_to + datetime.timedelta(days=1), lesson_date)
+            covered_to = lesson_date
+        elif lesson_date < covered_from:
+            database.delete_lessons_by_group_and_date_range(session, group, lesson_date, covered_from - datetime.timedelta(days=1))
+            covered_from = lesson_date
+
+        subject = database.add_subject(session, lesson.subject)
+        teacher = database.add_teacher(session, lesson.teacher)
+        classroom = database.add_classroom(session, lesson.classroom)
+        group = database.add_group(session, lesson.group)
+        database.add_lesson(session, subject, teacher, classroom, lesson.start_time, lesson.end_time, lesson.lesson_type, group)
+        count += 1
+    return count
+
+
+def reset_db() -> None:
+    dbm.Base.metadata.drop_all(database.engine)
+    dbm.Base.metadata.create_all(database.engine)
+
+
+def make_pages(groups: int, weeks: int) -> list:
+    names = [name for department in range(1, groups // 12 + 2) for course in range(1, 7)
+             for name in synthetic_group_names(department, course, 2)][:groups]
+    return [parse_schedule(synthetic_schedule_page(name, week)) for name in names for week in range(1, weeks + 1)]
+
+
+def run(upload, pages: list) -> float:
+    started = time.perf_counter()
+    rows = sum(upload(None, [batch]) for batch in pages)
+    return rows / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--weeks", type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)  # Построчный путь логирует каждый урок
+
+    pages = make_pages(args.groups, args.weeks)
+    rows = sum(len(batch) for batch in pages)
+    print(f"{len(pages)} страниц, {rows} уроков")
+    print(f"{'путь':<12}{'пустая БД, строк/с':>22}{'повтор, строк/с':>20}")
+    results = {}
+    for name, upload in (("построчно", legacy_schedule_upload), ("пакетно", scraper.schedule_upload)):
+        reset_db()
+        first = run(upload, pages)
+        second = run(upload, pages)
+        with database.get_session() as session:
+            stored = session.query(dbm.Lesson).count()
+        results[name] = (first, second)
+        print(f"{name:<12}{first:>22.0f}{second:>20.0f}   (в БД {stored} уроков)")
+    print(f"ускорение: x{results['пакетно'][0] / results['построчно'][0]:.1f} / "
+          f"x{results['пакетно'][1] / results['построчно'][1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# backend/conftest.py
+"""Тесты, импортирующие app.database, работают с временной БД, а не с ./schedule.db."""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="schedule_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'app.db')}"
+os.environ["SCHEDULER_ENABLED"] = "False"
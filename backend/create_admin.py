@@ -1,12 +1,8 @@
 import os
-from sqlalchemy.orm import sessionmaker
-from app.database import engine, dbm  # Импортируем engine и модели базы данных
+from app.database import dbm  # Модели базы данных (импорт создает таблицы в primary)
+from app.db_runtime import SessionLocal  # Сессии primary - тот же пул, что у API
 from app.auth import get_password_hash  # Импортируем функцию для хэширования пароля
 
-# Создаем сессию
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-db = SessionLocal()
-
 def create_admin():
     # Получаем данные администратора из переменных окружения
     username = os.getenv('ADMIN_USERNAME')
@@ -17,6 +13,10 @@ def create_admin():
         print("Admin credentials not provided. Skipping admin creation.")
         return
 
+    with SessionLocal() as db:
+        _create_admin(db, username, email, password)
+
+def _create_admin(db, username, email, password):
     # Проверяем, существует ли пользователь с таким email
     existing_user = db.query(dbm.User).filter(dbm.User.email == email).first()
 
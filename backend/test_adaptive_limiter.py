@@ -0,0 +1,130 @@
+# backend/test_adaptive_limiter.py
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from app.parsers import schedule_downloader
+from app.parsers.adaptive_limiter import AdaptiveLimiter
+from app.parsers.rate_limiter import HostRateLimiter
+
+
+class FakeServer:
+    """Локальный HTTP-сервер с настраиваемой задержкой и кодом ответа."""
+
+    def __init__(self, latency: float = 0.0, status: int = 200, body: str = "<html></html>"):
+        self.latency = latency
+        self.status = status
+        self.body = body
+        self.requests = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.readuntil(b"\r\n\r\n")
+        self.requests += 1
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+            body = self.body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {self.status} X\r\nContent-Type: text/html; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        finally:
+            self.inflight -= 1
+            writer.close()
+
+    async def __aenter__(self) -> "FakeServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/"
+
+
+async def drive(limiter: AdaptiveLimiter, server: FakeServer, requests: int, concurrency: int) -> None:
+    """Гоняет requests запросов через limiter с concurrency конкурентными клиентами."""
+    remaining = iter(range(requests))
+
+    async def client_task(client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            try:
+                async with limiter.slot() as sample:
+                    r = await client.get(server.url)
+                    if r.status_code >= 500:
+                        sample.failed()
+            except httpx.TimeoutException:
+                pass
+
+    async with httpx.AsyncClient(timeout=0.5) as client:
+        await asyncio.gather(*(client_task(client) for _ in range(concurrency)))
+
+
+def make_limiter(**kwargs) -> AdaptiveLimiter:
+    params = dict(min_limit=1, max_limit=8, initial_limit=2, target_p90=0.2, max_error_rate=0.1, window=5)
+    params.update(kwargs)
+    return AdaptiveLimiter(**params)
+
+
+class TestAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_increases_while_healthy(self):
+        """Быстрый сервер без ошибок: лимит растет до максимума."""
+        limiter = make_limiter()
+        async with FakeServer(latency=0.01) as server:
+            await drive(limiter, server, requests=120, concurrency=16)
+        self.assertEqual(limiter.limit, 8)
+        self.assertGreater(limiter.stats["increases"], 0)
+        self.assertLessEqual(server.max_inflight, 8)
+
+    async def test_backs_off_on_server_errors(self):
+        """5xx: лимит уменьшается до минимума."""
+        limiter = make_limiter(initial_limit=8)
+        async with FakeServer(latency=0.01, status=503) as server:
+            await drive(limiter, server, requests=60, concurrency=16)
+        self.assertEqual(limiter.limit, 1)
+        self.assertEqual(limiter.stats["last_decision"], "decrease")
+
+    async def test_backs_off_on_latency_spike(self):
+        """Рост задержки выше target_p90 после здоровой фазы уменьшает лимит."""
+        limiter = make_limiter()
+        async with FakeServer(latency=0.01) as server:
+            await drive(limiter, server, requests=60, concurrency=16)
+            healthy_limit = limiter.limit
+            server.latency = 0.3
+            await drive(limiter, server, requests=20, concurrency=16)
+        self.assertLess(limiter.limit, healthy_limit)
+        self.assertGreater(limiter.stats["last_p90"], 0.2)
+
+    async def test_timeouts_count_as_errors(self):
+        limiter = make_limiter(initial_limit=4)
+        async with FakeServer(latency=1.0) as server:
+            await drive(limiter, server, requests=4, concurrency=4)
+        self.assertEqual(limiter.stats["errors"], 4)
+        self.assertLess(limiter.limit, 4)
+
+    async def test_get_html_goes_through_limiter(self):
+        limiter = make_limiter()
+        async with FakeServer(latency=0.01, body="<html>ok</html>") as server:
+            with patch.object(schedule_downloader, "adaptive_limiter", limiter), \
+                 patch.object(schedule_downloader, "disk_cache", None), \
+                 patch.object(schedule_downloader, "url_gen", lambda group, week: server.url), \
+                 patch.object(schedule_downloader, "rate_limiter", HostRateLimiter(0, 1)):
+                schedule_downloader.cache.clear()
+                async with httpx.AsyncClient() as client:
+                    html = await schedule_downloader.get_html(client, "TEST", 1)
+        self.assertEqual(html, "<html>ok</html>")
+        self.assertEqual(limiter.stats["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# backend/test_crawl_worker.py
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from app import db_models as dbm
+from app.mai_stub import MaiStub, synthetic_group_names
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StubThread:
+    """MaiStub в отдельном потоке со своим event loop: воркеры - отдельные процессы."""
+
+    def __init__(self, **kwargs):
+        self.stub = MaiStub(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> MaiStub:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.stub.start(), self._loop).result()
+        return self.stub
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self.stub.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class TestCrawlWorker(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.database_url = f"sqlite:///{os.path.join(self._tmp.name, 'crawl.db')}"
+        self.engine = create_engine(self.database_url)
+        dbm.Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def seed(self, group_names, weeks=range(1, 19), overrides=None) -> None:
+        now = datetime.datetime.now()
+        with Session(self.engine) as session, session.begin():
+            for group_name in group_names:
+                for week_number in weeks:
+                    page = dict(group_name=group_name, week_number=week_number, priority=0,
+                                status='pending', next_due_at=now, attempts=0)
+                    page.update((overrides or {}).get((group_name, week_number), {}))
+                    session.add(dbm.CrawlFrontier(**page))
+
+    def run_workers(self, base_url: str, count: int) -> list:
+        env = dict(os.environ, DATABASE_URL=self.database_url, MAI_BASE_URL=base_url, PYTHONPATH=BACKEND_DIR,
+                   DISK_CACHE_ENABLED="False", CRAWL_RATE="0", PARSE_WORKERS="0",
+                   CRAWL_CONCURRENCY="4", CRAWL_CLAIM_BATCH="8", CRAWL_IDLE_SLEEP="0.5")
+        workers = [
+            subprocess.Popen([sys.executable, "-m", "app.crawl_worker", "--exit-when-idle", "--worker-id", f"w{index}"],
+                             cwd=self._tmp.name, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for index in range(count)
+        ]
+        results = []
+        for worker in workers:
+            stdout, _ = worker.communicate(timeout=120)
+            self.assertEqual(worker.returncode, 0)
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+        return results
+
+    def frontier(self) -> list:
+        with Session(self.engine) as session:
+            return session.execute(select(dbm.CrawlFrontier)).scalars().all()
+
+    def test_workers_share_frontier(self):
+        """Несколько процессов с одной БД: каждая страница обработана ровно одним воркером."""
+        groups = [name for course in range(1, 5) for name in synthetic_group_names(1, course, 2)]
+        self.seed(groups)
+        with StubThread(latency=0.02) as stub:
+            results = self.run_workers(stub.base_url, 3)
+
+        self.assertEqual(sum(result["pages_done"] for result in results), len(groups) * 18)
+        self.assertTrue(all(result["pages_done"] > 0 for result in results))
+        self.assertTrue(all(result["pages_failed"] == 0 for result in results))
+        self.assertEqual(stub.stats["synthetic"], len(groups) * 18)  # Ни одна страница не загружена дважды
+        for page in self.frontier():
+            self.assertEqual(page.status, 'pending')
+            self.assertIsNone(page.lease_owner)
+            self.assertIsNotNone(page.last_crawled_at)
+        with Session(self.engine) as session:
+            self.assertGreater(session.execute(select(func.count()).select_from(dbm.Lesson)).scalar_one(), 0)
+
+    def test_expired_lease_is_retried(self):
+        """Страницы упавшего воркера обрабатываются после истечения аренды, живая аренда не перехватывается."""
+        now = datetime.datetime.now()
+        group = synthetic_group_names(1, 1, 1)[0]
+        dead = dict(status='in_progress', lease_owner='dead', lease_expires_at=now - datetime.timedelta(seconds=1))
+        alive = dict(status='in_progress', lease_owner='slow', lease_expires_at=now + datetime.timedelta(seconds=2))
+        self.seed([group], weeks=range(1, 6), overrides={(group, 1): dead, (group, 2): dead, (group, 3): alive})
+        with StubThread() as stub:
+            results = self.run_workers(stub.base_url, 1)
+
+        self.assertEqual(results[0]["pages_done"], 5)
+        self.assertEqual(stub.stats["synthetic"], 5)
+        for page in self.frontier():
+            self.assertEqual(page.status, 'pending')
+            self.assertIsNone(page.lease_owner)
+            self.assertIsNotNone(page.last_crawled_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
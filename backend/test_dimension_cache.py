@@ -0,0 +1,45 @@
+# backend/test_dimension_cache.py
+import unittest
+from sqlalchemy import delete
+from app import database
+from app.database import dbm, dimension_cache
+
+
+class TestDimensionCache(unittest.TestCase):
+
+    def setUp(self):
+        with database.get_session() as session:
+            session.execute(delete(dbm.Teacher))
+        dimension_cache.invalidate()
+
+    def resolve(self, session, *names) -> dict:
+        return database.resolve_names(session, dbm.Teacher, names)
+
+    def test_ids_seen_in_rolled_back_transaction_are_not_cached(self):
+        """Имя, вставленное и повторно найденное в откатанной транзакции, не попадает в кэш."""
+        with database.SessionLocal() as session:
+            rolled_back_id = self.resolve(session, "Иванов И.И.")["Иванов И.И."]
+            self.assertEqual(self.resolve(session, "Иванов И.И."), {"Иванов И.И.": rolled_back_id})  # SELECT видит вставку
+            session.rollback()
+        self.assertEqual(dimension_cache.lookup(dbm.Teacher, {"Иванов И.И."}), ({}, {"Иванов И.И."}))
+
+        with database.get_session() as session:
+            petrov_id = self.resolve(session, "Петров П.П.")["Петров П.П."]  # SQLite может отдать тот же id
+            ivanov_id = self.resolve(session, "Иванов И.И.")["Иванов И.И."]
+        self.assertNotEqual(ivanov_id, petrov_id)
+        with database.get_session() as session:
+            self.assertEqual(session.get(dbm.Teacher, ivanov_id).name, "Иванов И.И.")
+
+    def test_found_ids_are_cached_after_commit(self):
+        with database.get_session() as session:
+            ids = self.resolve(session, "Сидоров С.С.")
+        dimension_cache.invalidate()
+        with database.SessionLocal() as session:
+            self.assertEqual(self.resolve(session, "Сидоров С.С."), ids)  # Найдено SELECT, еще не в кэше
+            self.assertEqual(dimension_cache.lookup(dbm.Teacher, {"Сидоров С.С."}), ({}, {"Сидоров С.С."}))
+            session.commit()
+        self.assertEqual(dimension_cache.lookup(dbm.Teacher, {"Сидоров С.С."}), (ids, set()))
+
+
+if __name__ == "__main__":
+    unittest.main()
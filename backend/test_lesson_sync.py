@@ -0,0 +1,68 @@
+# backend/test_lesson_sync.py
+import datetime
+import unittest
+from sqlalchemy import delete, select
+from app import database, scraper
+from app.database import dbm
+from app.parsers.lesson_batch import LessonBatch
+
+MONDAY = datetime.datetime(2025, 3, 3, 9, 0)
+GROUP = "М8О-101Б-24"
+
+
+def lesson(day: int, subject: str, teacher: str = "Иванов И.И.", classroom: str = "ГУК Б-101",
+           lesson_type: str = "ЛК") -> tuple:
+    start = MONDAY + datetime.timedelta(days=day)
+    return subject, teacher, classroom, start, start + datetime.timedelta(minutes=90), lesson_type, GROUP
+
+
+class TestLessonSync(unittest.TestCase):
+
+    def setUp(self):
+        with database.get_session() as session:
+            session.execute(delete(dbm.Lesson))
+        for key in scraper.lesson_sync_stats:
+            scraper.lesson_sync_stats[key] = 0
+
+    def write(self, *lessons) -> None:
+        with database.get_session() as session:
+            scraper.write_schedule(session, [LessonBatch.from_rows(lessons)])
+
+    def stored(self) -> dict:
+        """start_time -> (id, предмет, аудитория, тип) уроков группы."""
+        with database.get_session() as session:
+            rows = session.execute(
+                select(dbm.Lesson.start_time, dbm.Lesson.id, dbm.Subject.name, dbm.Classroom.name, dbm.Lesson.lesson_type)
+                .join(dbm.Subject).join(dbm.Classroom)
+            ).all()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def test_unchanged_changed_and_removed_lessons(self):
+        self.write(lesson(0, "Физика"), lesson(1, "Химия"), lesson(2, "История"))
+        before = self.stored()
+        self.assertEqual(scraper.lesson_sync_stats, {"inserted": 3, "updated": 0, "deleted": 0, "unchanged": 0})
+
+        # Понедельник без изменений, во вторник другая аудитория, среда пропала, в четверг новый урок
+        self.write(lesson(0, "Физика"), lesson(1, "Химия", classroom="ГУК Б-202"), lesson(3, "Математика"))
+        after = self.stored()
+        self.assertEqual(scraper.lesson_sync_stats, {"inserted": 4, "updated": 1, "deleted": 1, "unchanged": 1})
+
+        monday, tuesday, wednesday, thursday = (MONDAY + datetime.timedelta(days=day) for day in range(4))
+        self.assertEqual(after[monday], before[monday])  # Неизменившийся урок сохраняет id
+        self.assertEqual(after[tuesday], (before[tuesday][0], "Химия", "ГУК Б-202", "ЛК"))  # UPDATE на месте
+        self.assertNotIn(wednesday, after)
+        self.assertEqual(after[thursday][1:], ("Математика", "ГУК Б-101", "ЛК"))
+        self.assertEqual(len(after), 3)
+
+    def test_lessons_outside_the_page_dates_are_kept(self):
+        """Удаляются только исчезнувшие уроки в диапазоне дат страницы, а не все уроки группы."""
+        self.write(lesson(0, "Физика"), lesson(7, "Химия"))
+        self.write(lesson(0, "Физика", lesson_type="ПЗ"))
+        after = self.stored()
+        self.assertEqual(sorted(value[1:] for value in after.values()),
+                         [("Физика", "ГУК Б-101", "ПЗ"), ("Химия", "ГУК Б-101", "ЛК")])
+        self.assertEqual(scraper.lesson_sync_stats["deleted"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# backend/test_query_plans.py
+import datetime
+import unittest
+from sqlalchemy import create_engine, select
+from app import db_models as dbm
+from app import lesson_queries
+
+DAY = datetime.date(2025, 3, 3)
+
+
+def hot_queries() -> dict:
+    """Запросы, которые должны идти по индексу, а не полным сканированием lessons."""
+    return {
+        "group_lessons_in_range": lesson_queries.group_lessons_in_range(1, DAY, DAY + datetime.timedelta(days=6)),
+        "lessons_by_subject": lesson_queries.lessons_by_subject("Физика"),
+        "classroom_schedule": lesson_queries.classroom_schedule("ГУК Б-101", DAY),
+        "resolve_teacher_names": select(dbm.Teacher.name, dbm.Teacher.id).where(dbm.Teacher.name.in_(["a", "b"])),
+    }
+
+
+class TestQueryPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://")
+        dbm.Base.metadata.create_all(cls.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def explain(self, stmt) -> list:
+        sql = str(stmt.compile(self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as conn:
+            return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+    def test_hot_queries_use_indexes(self):
+        for name, stmt in hot_queries().items():
+            with self.subTest(query=name):
+                plan = self.explain(stmt)
+                full_scans = [step for step in plan if step.startswith("SCAN")]  # В т.ч. SCAN ... USING INDEX - обход всего индекса
+                self.assertFalse(full_scans, f"{name}: полное сканирование {full_scans} в плане {plan}")
+
+    def test_date_range_is_sargable(self):
+        """Диапазон дат урока должен использовать start_time из индекса, а не только group_id."""
+        plan = self.explain(lesson_queries.group_lessons_in_range(1, DAY, DAY))
+        self.assertTrue(any("start_time>" in step and "start_time<" in step for step in plan), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()